@@ -3,12 +3,104 @@ from pydantic import Field
 
 class Settings(BaseSettings):
     APP_NAME: str = "Wedding Backend"
+    LOG_LEVEL: str = "INFO"
 
     MONGO_URI: str = Field(default="mongodb://mongo:27017")
     MASTER_DB: str = Field(default="master_db")
+    # database for tenant collections; empty means MASTER_DB
+    TENANT_DB: str = Field(default="")
+
+    # connection pool tuning for the async client
+    MONGO_MAX_POOL_SIZE: int = 200
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 60_000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5_000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5_000
+
+    # /readyz: ping timeout and how long a result is reused
+    READINESS_TIMEOUT_SECONDS: float = 1.0
+    READINESS_CACHE_SECONDS: float = 1.0
+    # startup index sync (app/indexes.py): create missing indexes, or only report them
+    INDEX_AUTO_CREATE: bool = True
+    # missing / failed indexes are re-diffed with backoff between these two delays
+    INDEX_SYNC_RETRY_SECONDS: float = 2.0
+    INDEX_SYNC_MAX_RETRY_SECONDS: float = 300.0
+    # indexes every tenant collection gets, as JSON: [{"keys": [["field", 1]], "unique": false}]
+    TENANT_INDEX_TEMPLATES: list[dict] = []
+    # startup hooks taking longer than this are logged as a warning
+    STARTUP_BUDGET_SECONDS: float = 2.0
 
     SECRET_KEY: str = Field(default="add key here")  # will be overridden by .env
-    TOKEN_EXPIRE_HOURS: int = 6
+    # access tokens are short-lived; clients renew them with a refresh token
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # "native" (cryptography, HS256/ES256/EdDSA) or "jose" (python-jose)
+    JWT_BACKEND: str = "native"
+    # JSON key ring with kid-tagged keys; empty means HS256 with SECRET_KEY
+    JWT_KEYS_FILE: str = ""
+    # keep verifying kid-less SECRET_KEY tokens while migrating to a key ring
+    JWT_ACCEPT_LEGACY_TOKENS: bool = True
+    # verified-token cache; entries never outlive the token's exp
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL_SECONDS: float = 300.0
+
+    # failed-login rate limiting: token buckets per client IP and per email
+    LOGIN_RATE_LIMIT_ENABLED: bool = True
+    LOGIN_IP_BURST: int = 20
+    LOGIN_IP_REFILL_PER_MINUTE: float = 10.0
+    LOGIN_EMAIL_BURST: int = 5
+    LOGIN_EMAIL_REFILL_PER_MINUTE: float = 1.0
+    # "memory" (per worker) or "mongo" (shared by all workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_COLLECTION: str = "rate_limits"
+    # take the client IP from X-Forwarded-For (only behind a trusted proxy)
+    TRUST_FORWARDED_FOR: bool = False
+
+    # bcrypt cost for new hashes; logins rehash stored hashes with another cost
+    # (pick one with scripts/calibrate_bcrypt.py)
+    BCRYPT_ROUNDS: int = 12
+
+    # bcrypt process pool; 0 means "derive from CPU count"
+    HASH_POOL_WORKERS: int = 0
+    HASH_POOL_MAX_PENDING: int = 0
+    HASH_POOL_RETRY_AFTER_SECONDS: int = 1
+
+    # POST /org/bulk_create
+    BULK_CREATE_MAX_ROWS: int = 10_000
+    BULK_CREATE_BATCH_SIZE: int = 500
+    # bodies are read no further than this (a JSON array can only be counted once parsed)
+    BULK_CREATE_MAX_BYTES: int = 8 * 1024 * 1024
+
+    # tenant collection copy (org rename)
+    TENANT_COPY_PARTITIONS: int = 8
+    TENANT_COPY_CONCURRENCY: int = 4
+    TENANT_COPY_BATCH_SIZE: int = 1000
+
+    # background jobs (org rename/delete)
+    JOB_WORKER_ENABLED: bool = True  # run the worker inside the API process
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_POLL_INTERVAL_SECONDS: float = 1.0
+    JOB_LEASE_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF_SECONDS: float = 5.0
+
+    # org metadata cache
+    ORG_CACHE_SIZE: int = 10_000
+    ORG_CACHE_TTL_SECONDS: float = 60.0
+    # "mongo" (capped-collection pub/sub, cross-worker) or "memory" (single process)
+    CACHE_INVALIDATION_BACKEND: str = "mongo"
+    CACHE_INVALIDATION_COLLECTION: str = "cache_invalidations"
+    CACHE_INVALIDATION_COLLECTION_BYTES: int = 1_048_576
+
+    # request profiler, off until switched on with PUT /debug/profiling
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 200  # newest request reports kept
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_SAMPLE_RATE: float = 0.01
+    PROFILING_SLOW_MS: float = 500.0
+    PROFILING_MAX_DURATION_SECONDS: int = 3600
+    # comma-separated admin ids allowed to use the /debug endpoints; empty disables them
+    OPERATOR_ADMIN_IDS: str = ""
 
     class Config:
         env_file = ".env"
@@ -1,34 +1,59 @@
+import asyncio
 import re
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
 from .config import settings
-import time
-from pymongo.errors import ServerSelectionTimeoutError
+from .utils.instrumentation import MongoCommandMetrics
 
-_client: MongoClient | None = None
+# server error codes
+NAMESPACE_NOT_FOUND = 26
+NAMESPACE_EXISTS = 48
+DUPLICATE_KEY = 11000
+
+_client: AsyncMongoClient | None = None
 _master_db = None
 
 
-def get_client():
+def get_client() -> AsyncMongoClient:
+    """
+    Returns the process-wide async client. Construction does not block:
+    the driver connects in the background on first use.
+    """
     global _client
     if _client is None:
-        for i in range(5):
-            try:
-                _client = MongoClient(str(settings.MONGO_URI), serverSelectionTimeoutMS=5000)
-                _client.admin.command("ping")
-                break
-            except ServerSelectionTimeoutError:
-                time.sleep(1)
-        else:
-            raise RuntimeError("Could not connect to MongoDB")
+        _client = AsyncMongoClient(
+            str(settings.MONGO_URI),
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            event_listeners=[MongoCommandMetrics()],
+        )
     return _client
 
-"""
-def get_client() -> MongoClient:
-    global _client
-    if _client is None:
-        _client = MongoClient(str(settings.MONGO_URI))
-    return _client
-"""
+
+async def connect_client(retries: int = 5):
+    """
+    Ping MongoDB until it answers, without blocking the event loop between attempts.
+    """
+    client = get_client()
+    for _ in range(retries):
+        try:
+            await client.admin.command("ping")
+            return client
+        except ServerSelectionTimeoutError:
+            await asyncio.sleep(1)
+    raise RuntimeError("Could not connect to MongoDB")
+
+
+async def close_client():
+    global _client, _master_db
+    if _client is not None:
+        await _client.close()
+    _client = None
+    _master_db = None
+
 
 def get_master_db():
     global _master_db
@@ -37,6 +62,23 @@ def get_master_db():
     return _master_db
 
 
+def get_tenant_db(db_name: str | None = None):
+    """
+    Database holding tenant collections. Orgs record the db their collection lives
+    in (orgs created before that field existed live in MASTER_DB), so pass that name
+    for existing tenants; new tenants go to TENANT_DB.
+    """
+    return get_client()[db_name or settings.TENANT_DB or settings.MASTER_DB]
+
+
+async def collection_exists(db, coll_name: str) -> bool:
+    """
+    Existence check via a filtered listCollections, so the cost does not grow
+    with the number of tenant collections in the database.
+    """
+    return bool(await db.list_collection_names(filter={"name": coll_name}))
+
+
 def sanitize_org_name(org_name: str) -> str:
     """
     Convert org name into a safe collection suffix:
@@ -50,28 +92,39 @@ def sanitize_org_name(org_name: str) -> str:
     return s or "org_default"
 
 
+def org_name_key(org_name: str) -> str:
+    """
+    Normalized lookup key for an org name. Stored as `name_key` on the org doc
+    (unique index) so case-insensitive lookups are exact index hits.
+    """
+    return org_name.strip().lower()
+
+
 def tenant_collection_name(org_name: str) -> str:
     return f"org_{sanitize_org_name(org_name)}"
 
 
-def create_tenant_collection(org_name: str):
+async def create_tenant_collection(org_name: str):
     """
     Creates a tenant collection if not exists.
     Returns the collection object.
     """
-    client = get_client()
-    db = client[settings.MASTER_DB]  # using master_db for meta, tenants may use same server
+    db = get_tenant_db()  # defaults to master_db; tenants may use same server
     coll_name = tenant_collection_name(org_name)
-    # creating collection explicitly (Mongo creates lazily on first insert otherwise)
-    if coll_name not in db.list_collection_names():
-        db.create_collection(coll_name)
+    # creating collection explicitly (Mongo creates lazily on first insert otherwise);
+    # one round trip: just create it and treat "already exists" as success
+    try:
+        await db.create_collection(coll_name, check_exists=False)
+    except OperationFailure as e:
+        if e.code != NAMESPACE_EXISTS:
+            raise
     return db[coll_name]
 
 
-def delete_tenant_collection(org_name: str):
+async def delete_tenant_collection(org_name: str, db_name: str | None = None):
     coll_name = tenant_collection_name(org_name)
-    db = get_master_db()
-    if coll_name in db.list_collection_names():
-        db.drop_collection(coll_name)
+    db = get_tenant_db(db_name)
+    if await collection_exists(db, coll_name):
+        await db.drop_collection(coll_name)
         return True
     return False
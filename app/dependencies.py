@@ -1,8 +1,9 @@
 from fastapi import Depends, Header, HTTPException, status
 from typing import Optional
+from .config import settings
 from .services.auth_service import AuthService
 
-def get_bearer_token(authorization: Optional[str] = Header(None)) -> str:
+async def get_bearer_token(authorization: Optional[str] = Header(None)) -> str:
     if not authorization:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authorization header missing")
     parts = authorization.split()
@@ -10,5 +11,14 @@ def get_bearer_token(authorization: Optional[str] = Header(None)) -> str:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth header")
     return parts[1]
 
-def require_admin(token: str = Depends(get_bearer_token)):
-    return AuthService.get_current_admin_from_token(token)
+async def require_admin(token: str = Depends(get_bearer_token)):
+    return await AuthService.get_current_admin_from_token(token)
+
+async def require_operator(admin=Depends(require_admin)):
+    """
+    Admins listed in OPERATOR_ADMIN_IDS; process-wide controls are not for every tenant admin.
+    """
+    operators = {a.strip() for a in settings.OPERATOR_ADMIN_IDS.split(",") if a.strip()}
+    if admin.get("admin_id") not in operators:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operator access required")
+    return admin
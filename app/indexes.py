@@ -0,0 +1,329 @@
+"""
+Declarative index registry. The app diffs it against the server at startup and
+creates what is missing in the background (see IndexManager); scripts/init_db.py
+applies the same registry by hand.
+
+Tenant collections get the TENANT_INDEX_TEMPLATES indexes when they are created;
+scripts/reconcile_tenant_indexes.py rolls template changes out to existing tenants.
+"""
+import asyncio
+import logging
+import time
+
+import pymongo
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from .config import settings
+from .database import collection_exists, get_master_db, get_tenant_db, org_name_key
+
+logger = logging.getLogger(__name__)
+
+
+class IndexSpec:
+    """
+    One index: key pattern plus createIndexes options (unique, name,
+    expireAfterSeconds, ...). `required` indexes gate readiness: without them
+    lookups scan and uniqueness is not enforced.
+    """
+
+    def __init__(self, keys: list[tuple[str, int]], required: bool = False, **options):
+        self.keys = keys
+        self.required = required
+        self.options = options
+
+    @property
+    def name(self) -> str:
+        return self.options.get("name") or "_".join(f"{k}_{d}" for k, d in self.keys)
+
+    def model(self) -> IndexModel:
+        return IndexModel(self.keys, **self.options)
+
+    def compare(self, existing: dict) -> str | None:
+        """
+        Status against the server's index_information(): "ok" when an index with
+        the same keys and options exists, "conflict" when the keys match but the
+        options differ (left alone; fixing it means a drop), None when missing.
+        """
+        for info in existing.values():
+            if [(k, d if isinstance(d, str) else int(d)) for k, d in info["key"]] != self.keys:
+                continue
+            if all(info.get(opt) == val for opt, val in self.options.items() if opt != "name"):
+                return "ok"
+            return "conflict"
+        return None
+
+
+MASTER_INDEXES: dict[str, list[IndexSpec]] = {
+    "organizations": [
+        IndexSpec([("name", ASCENDING)], unique=True),
+        # exact-match case-insensitive lookups; legacy orgs need scripts/init_db.py
+        # to backfill name_key before this can build
+        # /org/get is one point lookup on it plus a single document fetch; a
+        # covering compound index would only save that fetch, at the cost of a
+        # second copy of every org's metadata to maintain on each write
+        IndexSpec([("name_key", ASCENDING)], required=True, unique=True),
+    ],
+    "admins": [
+        IndexSpec([("email", ASCENDING)], required=True, unique=True),
+        # update_many / delete_many by org on rename and delete
+        IndexSpec([("org", ASCENDING)]),
+    ],
+    "jobs": [
+        IndexSpec([("status", ASCENDING), ("run_after", ASCENDING), ("created_at", ASCENDING)]),
+        IndexSpec([("status", ASCENDING), ("lease_until", ASCENDING)]),
+    ],
+    "refresh_tokens": [
+        # expired refresh tokens are removed by the TTL monitor
+        IndexSpec([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        IndexSpec([("family", ASCENDING)]),
+        IndexSpec([("admin_id", ASCENDING)]),
+    ],
+    # idle login buckets (MongoRateLimitStore), wherever RATE_LIMIT_COLLECTION points
+    settings.RATE_LIMIT_COLLECTION: [
+        IndexSpec([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+}
+
+
+def tenant_index_specs() -> list[IndexSpec]:
+    """
+    TENANT_INDEX_TEMPLATES entries: {"keys": [["field", 1], ...], <createIndexes options>}.
+    """
+    specs = []
+    for template in settings.TENANT_INDEX_TEMPLATES:
+        options = {k: v for k, v in template.items() if k != "keys"}
+        specs.append(IndexSpec([(k, d) for k, d in template["keys"]], **options))
+    return specs
+
+
+def plan(existing: dict, specs: list[IndexSpec]) -> tuple[list[IndexSpec], dict[str, str]]:
+    """
+    Specs still to create, plus the status of the ones already settled.
+    """
+    missing, status = [], {}
+    for spec in specs:
+        state = spec.compare(existing)
+        if state is None:
+            missing.append(spec)
+        else:
+            status[spec.name] = state
+    return missing, status
+
+
+async def apply_indexes(coll, specs: list[IndexSpec], create: bool = True) -> dict[str, str]:
+    """
+    Diff `specs` against `coll` and create the missing ones in one createIndexes
+    call. Idempotent: a second run finds everything "ok" and sends nothing.
+    """
+    missing, status = plan(await coll.index_information(), specs)
+    if missing and create:
+        try:
+            await coll.create_indexes([spec.model() for spec in missing])
+            status.update({spec.name: "created" for spec in missing})
+        except PyMongoError:
+            # one bad spec fails the whole batch; retry singly to report each
+            for spec in missing:
+                try:
+                    await coll.create_indexes([spec.model()])
+                    status[spec.name] = "created"
+                except PyMongoError as e:
+                    status[spec.name] = f"error: {e}"
+    else:
+        status.update({spec.name: "missing" for spec in missing})
+    return status
+
+
+async def create_tenant_indexes(coll):
+    """
+    Template indexes for a tenant collection that was just created: nothing to
+    diff against, so one createIndexes call. Failures are logged rather than
+    failing org creation; the reconcile command reports and retries them.
+    """
+    specs = tenant_index_specs()
+    if not specs:
+        return
+    try:
+        await coll.create_indexes([spec.model() for spec in specs])
+    except PyMongoError as e:
+        logger.warning("tenant index templates on %s failed: %s", coll.name, e)
+
+
+async def clone_indexes(src, dest) -> list[str]:
+    """
+    Recreate the secondary indexes of `src` on `dest` (same keys, names and
+    options), e.g. after a cross-database tenant copy. Returns the names cloned.
+    """
+    models = []
+    for name, info in (await src.index_information()).items():
+        if name == "_id_":
+            continue
+        options = {k: v for k, v in info.items() if k not in ("key", "v", "ns")}
+        models.append(IndexModel(list(info["key"]), name=name, **options))
+    if models:
+        await dest.create_indexes(models)
+    return [m.document["name"] for m in models]
+
+
+async def reconcile_tenants(concurrency: int, create: bool = True, org_names: list[str] | None = None, on_result=None):
+    """
+    Apply the tenant templates to every tenant collection (or those of
+    `org_names`), `concurrency` collections at a time. Only adds indexes; extra
+    or conflicting ones are reported, never dropped. Collections that were never
+    materialized are skipped. Returns {status: count} over all indexes.
+    """
+    specs = tenant_index_specs()
+    totals: dict[str, int] = {}
+    query = {"name_key": {"$in": [org_name_key(n) for n in org_names]}} if org_names else {}
+    cursor = get_master_db()["organizations"].find(query, {"_id": 0, "name": 1, "collection": 1, "db": 1})
+    lock = asyncio.Lock()
+
+    async def worker():
+        while True:
+            async with lock:
+                org = await anext(cursor, None)
+            if org is None:
+                return
+            db = get_tenant_db(org.get("db", settings.MASTER_DB))
+            try:
+                if not await collection_exists(db, org["collection"]):
+                    result = {"collection": "skipped"}
+                else:
+                    result = await apply_indexes(db[org["collection"]], specs, create)
+            except PyMongoError as e:
+                result = {"collection": f"error: {e}"}
+            for state in result.values():
+                key = state.split(":", 1)[0]
+                totals[key] = totals.get(key, 0) + 1
+            if on_result is not None:
+                on_result(org["name"], result)
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        await cursor.close()
+    return totals
+
+
+class IndexManager:
+    """
+    Applies MASTER_INDEXES in the background, as soon as the DB answers. With
+    INDEX_AUTO_CREATE off it only verifies and reports. Collections with an
+    index that is not there yet (a failed build, legacy orgs still waiting for
+    the name_key backfill, a conflict dropped by hand) are diffed again with
+    backoff, from `retry_seconds` up to `max_retry_seconds`, until they are.
+    """
+
+    def __init__(
+        self,
+        registry: dict[str, list[IndexSpec]],
+        auto_create: bool,
+        retry_seconds: float,
+        max_retry_seconds: float,
+    ):
+        self.registry = registry
+        self.auto_create = auto_create
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self.state = "pending"
+        self.indexes: dict[str, str] = {}
+        self.seconds: float | None = None
+        self.passes = 0
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def required_ok(self) -> bool:
+        return all(
+            self.indexes.get(f"{coll}.{spec.name}") in ("ok", "created")
+            for coll, specs in self.registry.items()
+            for spec in specs
+            if spec.required
+        )
+
+    def report(self) -> dict:
+        return {"state": self.state, "seconds": self.seconds, "passes": self.passes, "indexes": self.indexes}
+
+    def _problems(self) -> dict[str, str]:
+        return {k: v for k, v in self.indexes.items() if v not in ("ok", "created")}
+
+    async def _run(self):
+        while True:
+            try:
+                with pymongo.timeout(settings.READINESS_TIMEOUT_SECONDS):
+                    await get_master_db().command("ping")
+                break
+            except PyMongoError:
+                await asyncio.sleep(self.retry_seconds)
+        self.state = "running"
+        start = time.monotonic()
+        await self._sync(list(self.registry))
+        self.seconds = round(time.monotonic() - start, 3)
+        created = sum(v == "created" for v in self.indexes.values())
+        problems = self._problems()
+        if not problems:
+            self.state = "done"
+            logger.info(
+                "index sync: %d created, %d already present (%.2fs)",
+                created, len(self.indexes) - created, self.seconds,
+            )
+            return
+        self.state = "failed"
+        logger.warning("index sync: %d created, problems (retrying): %s", created, problems)
+        delay = self.retry_seconds
+        while problems:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_seconds)
+            await self._sync(sorted({key.split(".", 1)[0] for key in problems}))
+            remaining = self._problems()
+            if remaining != problems and remaining:
+                logger.warning("index sync: still retrying: %s", remaining)
+            problems = remaining
+        self.state = "done"
+        logger.info("index sync: all indexes present after %d passes", self.passes)
+
+    async def _sync(self, collections: list[str]):
+        """
+        One diff-and-create pass over `collections`; re-reads index_information,
+        so an index built by hand meanwhile is picked up as "ok".
+        """
+        self.passes += 1
+        db = get_master_db()
+        results = await asyncio.gather(
+            *(apply_indexes(db[coll], self.registry[coll], self.auto_create) for coll in collections),
+            return_exceptions=True,
+        )
+        for coll, result in zip(collections, results, strict=True):
+            if isinstance(result, BaseException):
+                result = {spec.name: f"error: {result}" for spec in self.registry[coll]}
+            self.indexes.update({f"{coll}.{name}": state for name, state in result.items()})
+
+
+_manager: IndexManager | None = None
+
+
+def get_index_manager() -> IndexManager:
+    global _manager
+    if _manager is None:
+        _manager = IndexManager(
+            MASTER_INDEXES,
+            settings.INDEX_AUTO_CREATE,
+            settings.INDEX_SYNC_RETRY_SECONDS,
+            settings.INDEX_SYNC_MAX_RETRY_SECONDS,
+        )
+    return _manager
+
+
+async def stop_index_manager():
+    global _manager
+    if _manager is not None:
+        await _manager.stop()
+    _manager = None
@@ -1,13 +1,31 @@
-from fastapi import FastAPI
+import logging
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .config import settings
-from .database import get_client
+from .database import close_client
+from .utils.health import get_readiness, record_startup, stop_readiness
+from .indexes import get_index_manager, stop_index_manager
+from .utils.hashing import HashingPoolBusy, shutdown_hashing_executor
+from .utils.rate_limit import RateLimited
+from .utils.metrics import REGISTRY
+from .utils.instrumentation import RequestMetricsMiddleware
+from .utils.profiling import ProfilingMiddleware
+from .utils.responses import ORJSONResponse
+from .utils.invalidation import get_invalidation_bus
+from .utils.jwt import get_token_engine
 
 # routers
 from .routes import org as org_routes
 from .routes import auth as auth_routes
+from .routes import jobs as job_routes
+from .routes import debug as debug_routes
+from .services.job_service import get_job_worker, stop_job_worker
 
-app = FastAPI(title=settings.APP_NAME)
+logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title=settings.APP_NAME, default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,25 +34,88 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilingMiddleware)
+# added last so it wraps CORS and the routers: latency covers the whole app
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(org_routes.router, prefix="/org", tags=["org"])
 app.include_router(auth_routes.router, prefix="/admin", tags=["admin"])
+app.include_router(job_routes.router, prefix="/jobs", tags=["jobs"])
+app.include_router(debug_routes.router, prefix="/debug", tags=["debug"])
+
+@app.exception_handler(HashingPoolBusy)
+async def hashing_pool_busy_handler(request: Request, exc: HashingPoolBusy):
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited):
+    return ORJSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": "Too many failed attempts, retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 @app.on_event("startup")
-def startup_event():
-    client = get_client()
-    try:
-        client.admin.command("ping")
-        print("MongoDB connected.")
-    except Exception as e:
-        print("Failed to connect to MongoDB:", e)
+async def startup_event():
+    # nothing here waits on Mongo: a worker starts serving /healthz at once and
+    # reports ready on /readyz when the DB answers
+    get_readiness().warm_up()
+    get_index_manager().start()
+    await get_invalidation_bus().start()
+    if settings.JOB_WORKER_ENABLED:
+        await get_job_worker().start()
+    record_startup()
 
 @app.on_event("shutdown")
-def shutdown_event():
-    client = get_client()
-    client.close()
-    print("MongoDB connection closed.")
+async def shutdown_event():
+    await stop_job_worker()
+    await stop_readiness()
+    await stop_index_manager()
+    await get_invalidation_bus().stop()
+    await close_client()
+    shutdown_hashing_executor()
+    logger.info("MongoDB connection closed")
 
 @app.get("/")
-def root():
+async def root():
     return {"status": "ok", "service": settings.APP_NAME}
+
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness: the process is up and serving. Never touches the database.
+    """
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness: MongoDB answers a ping and the required indexes exist. 503 otherwise,
+    so load balancers only route to workers that can serve. `index_sync` shows the
+    startup index sync per index.
+    """
+    result = await get_readiness().check()
+    return ORJSONResponse(
+        status_code=status.HTTP_200_OK if result["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=result,
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus text exposition of in-process metrics: request, Mongo command, bcrypt
+    and JWT decode latency histograms plus hashing pool / threadpool saturation.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/.well-known/jwks.json")
+async def jwks():
+    """
+    Public keys of the JWT key ring, so other services can verify tokens themselves.
+    Empty when tokens are signed with the shared SECRET_KEY.
+    """
+    return get_token_engine().ring.jwks()
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
-from ..schemas import AdminLoginRequest, TokenResponse
+from fastapi import APIRouter, Request, status
+from ..utils.responses import ORJSONResponse
+from ..schemas import AdminLoginRequest, RefreshRequest, TokenResponse
 from ..services.auth_service import AuthService
+from ..utils.rate_limit import client_ip
 
 router = APIRouter()
 
 @router.post("/login", response_model=TokenResponse)
-def admin_login(payload: AdminLoginRequest):
+async def admin_login(payload: AdminLoginRequest, request: Request):
     """
     Admin login. Returns JWT access token on success.
     """
-    res = AuthService.authenticate_admin(payload.email, payload.password)
-    return JSONResponse(status_code=status.HTTP_200_OK, content=res)
+    res = await AuthService.authenticate_admin(payload.email, payload.password, client_ip(request))
+    return ORJSONResponse(status_code=status.HTTP_200_OK, content=res)
+
+@router.post("/refresh", response_model=TokenResponse)
+async def admin_refresh(payload: RefreshRequest):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    """
+    res = await AuthService.refresh(payload.refresh_token)
+    return ORJSONResponse(status_code=status.HTTP_200_OK, content=res)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+from ..config import settings
+from ..dependencies import require_operator
+from ..schemas import ProfilingRequest
+from ..utils.profiling import get_profiler, publish_config
+
+router = APIRouter()
+
+@router.get("/profiling")
+async def get_profiling(admin=Depends(require_operator)):
+    """
+    Current request profiler settings of the worker answering the request.
+    """
+    return get_profiler().state()
+
+@router.put("/profiling")
+async def set_profiling(payload: ProfilingRequest, admin=Depends(require_operator)):
+    """
+    Switch the request profiler on or off on every worker. While on, a `sample_rate`
+    share of requests plus every request slower than `slow_ms` is written to
+    PROFILING_DIR; it switches itself off after `duration_seconds`.
+    Request example:
+    { "enabled": true, "sample_rate": 0.05, "slow_ms": 300, "duration_seconds": 600 }
+    """
+    duration = min(
+        payload.duration_seconds or settings.PROFILING_MAX_DURATION_SECONDS,
+        settings.PROFILING_MAX_DURATION_SECONDS,
+    )
+    return await publish_config(
+        payload.enabled,
+        settings.PROFILING_SAMPLE_RATE if payload.sample_rate is None else payload.sample_rate,
+        settings.PROFILING_SLOW_MS if payload.slow_ms is None else payload.slow_ms,
+        duration,
+    )
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, status
+
+from ..dependencies import require_admin
+from ..services.job_service import JobService
+from ..utils.responses import ORJSONResponse
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, admin=Depends(require_admin)):
+    """
+    Status and progress of a background job (requires the admin token that queued it).
+    """
+    job = await JobService.get_job(job_id)
+    if not job or job.get("requested_by") != admin.get("admin_id"):
+        return ORJSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Job not found"})
+    return JobService.serialize(job)
@@ -1,38 +1,243 @@
-from fastapi import APIRouter, status, Depends
-from fastapi.responses import JSONResponse
-from ..schemas import OrgCreateRequest, OrgMeta
+import base64
+import orjson
+from typing import Literal
+from bson import ObjectId
+from fastapi import APIRouter, Query, Request, status, Depends
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from ..config import settings
+from ..database import org_name_key
+from ..utils.responses import ORJSONResponse, ndjson_line
+from ..schemas import OrgCreateRequest, OrgGetManyRequest, OrgGetManyResponse, OrgMeta
 from ..services.org_service import OrgService
-from ..dependencies import require_admin
+from ..services.job_service import enqueue_org_job
+from ..dependencies import require_admin, require_operator
 
 router = APIRouter()
 
 @router.post("/create", response_model=OrgMeta, status_code=status.HTTP_201_CREATED)
-def create_org(payload: OrgCreateRequest):
+async def create_org(payload: OrgCreateRequest):
     """
     Create an organization and its admin (master DB).
     """
-    res = OrgService.create_org(payload.organization_name.strip(), payload.email, payload.password)
+    res = await OrgService.create_org(payload.organization_name.strip(), payload.email, payload.password)
     body = {"name": res["name"], "collection": res["collection"], "admin_email": res["admin_email"]}
-    return JSONResponse(status_code=status.HTTP_201_CREATED, content=body)
+    return ORJSONResponse(status_code=status.HTTP_201_CREATED, content=body)
+
+
+def _bulk_row(index: int, item) -> dict:
+    """
+    Validate one bulk_create item; invalid rows carry their error instead.
+    """
+    try:
+        row = OrgCreateRequest.model_validate(item)
+    except ValidationError as e:
+        err = e.errors()[0]
+        field = ".".join(str(p) for p in err["loc"])
+        name = item.get("organization_name") if isinstance(item, dict) else None
+        return {"index": index, "name": name, "error": f"{field}: {err['msg']}" if field else err["msg"]}
+    return {"index": index, "name": row.organization_name.strip(), "email": row.email, "password": row.password}
+
+
+def _too_large(detail: str) -> ORJSONResponse:
+    return ORJSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, content={"detail": detail})
+
+
+async def _read_bulk_rows(request: Request) -> list[dict] | ORJSONResponse:
+    """
+    Read the body, giving up (413) as soon as it passes BULK_CREATE_MAX_BYTES or,
+    for NDJSON, BULK_CREATE_MAX_ROWS lines; the rest is never read.
+    """
+    max_rows, max_bytes = settings.BULK_CREATE_MAX_ROWS, settings.BULK_CREATE_MAX_BYTES
+    rows_error = f"At most {max_rows} rows per request"
+    bytes_error = f"At most {max_bytes} bytes per request"
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        return _too_large(bytes_error)
+    content_type = request.headers.get("content-type", "")
+    ndjson = "ndjson" in content_type or "jsonlines" in content_type
+    items: list = []
+    chunks: list[bytes] = []
+    buffer = b""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            return _too_large(bytes_error)
+        if ndjson:
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            items.extend(line for line in lines if line.strip())
+            if len(items) > max_rows:
+                return _too_large(rows_error)
+        else:
+            chunks.append(chunk)
+    if ndjson:
+        if buffer.strip():
+            items.append(buffer)
+    else:
+        try:
+            items = orjson.loads(b"".join(chunks))
+        except ValueError:
+            return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Body must be a JSON array or NDJSON"})
+        if not isinstance(items, list):
+            return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Body must be a JSON array or NDJSON"})
+    if len(items) > max_rows:
+        return _too_large(rows_error)
+    rows = []
+    for index, item in enumerate(items):
+        if isinstance(item, bytes):
+            try:
+                item = orjson.loads(item)
+            except ValueError:
+                rows.append({"index": index, "name": None, "error": "Invalid JSON line"})
+                continue
+        rows.append(_bulk_row(index, item))
+    return rows
+
+
+async def _bulk_results(rows: list[dict]):
+    seen_names: set = set()
+    seen_emails: set = set()
+    created = failed = 0
+    size = settings.BULK_CREATE_BATCH_SIZE
+    for start in range(0, len(rows), size):
+        batch = rows[start:start + size]
+        results = [{**row, "status": "error"} for row in batch if "error" in row]
+        results += await OrgService.bulk_create([row for row in batch if "error" not in row], seen_names, seen_emails)
+        for res in sorted(results, key=lambda r: r["index"]):
+            if res["status"] == "created":
+                created += 1
+            else:
+                failed += 1
+            yield ndjson_line(res)
+    yield ndjson_line({"summary": {"created": created, "failed": failed}})
+
+
+@router.post("/bulk_create")
+async def bulk_create_orgs(request: Request, admin=Depends(require_operator)):
+    """
+    Create many organizations at once (operators only: every row costs a
+    password hash on the pool logins share). The body is a JSON array or NDJSON
+    (Content-Type: application/x-ndjson) of /org/create payloads. Rows succeed or
+    fail independently; results stream back as NDJSON, one line per row in input
+    order, followed by a summary line.
+    """
+    rows = await _read_bulk_rows(request)
+    if isinstance(rows, ORJSONResponse):
+        return rows
+    return StreamingResponse(_bulk_results(rows), media_type="application/x-ndjson")
 
 
 @router.get("/get", response_model=OrgMeta)
-def get_org(organization_name: str):
+async def get_org(organization_name: str):
     """
-    Get organization metadata by name. Returns admin_email as well (fetched from master admins collection).
+    Get organization metadata by name. Returns admin_email as well (denormalized on the org doc).
     Example: /org/get?organization_name=acme_corp
     """
-    org = OrgService.get_org_by_name(organization_name.strip())
+    org = await OrgService.get_org_by_name(organization_name.strip())
     if not org:
-        return JSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Organization not found"})
+        return ORJSONResponse(status_code=status.HTTP_404_NOT_FOUND, content={"detail": "Organization not found"})
     body = {"name": org["name"], "collection": org["collection"], "admin_email": org.get("admin_email")}
-    return body
+    return ORJSONResponse(content=body)
+
+
+@router.post("/get_many", response_model=OrgGetManyResponse)
+async def get_many_orgs(payload: OrgGetManyRequest):
+    """
+    Metadata for several organizations in one call, keyed by the name as
+    requested. Names are matched case-insensitively like /org/get; names with no
+    organization are listed in `missing`.
+    """
+    found = await OrgService.get_orgs_by_names(payload.names)
+    orgs = {}
+    missing = []
+    for name in payload.names:
+        org = found.get(org_name_key(name))
+        if org is None:
+            missing.append(name)
+        else:
+            orgs[name] = {"name": org["name"], "collection": org["collection"], "admin_email": org.get("admin_email")}
+    return ORJSONResponse(content={"orgs": orgs, "missing": missing})
+
+
+def _encode_cursor(sort: str, value) -> str:
+    raw = orjson.dumps({"s": sort, "v": str(value)})
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str):
+    try:
+        data = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if data["s"] != sort:
+            return None
+        return data["v"] if sort == "name" else ObjectId(data["v"])
+    except Exception:
+        return None
+
+
+async def _list_stream(orgs, sort: str, limit: int, ndjson: bool):
+    """
+    Serialize orgs as they come off the cursor; the page is never held in memory.
+    """
+    last = None
+    count = 0
+    if not ndjson:
+        yield b'{"items":['
+    async for org in orgs:
+        last = org["name"] if sort == "name" else org["_id"]
+        item = {"name": org["name"], "collection": org["collection"], "admin_email": org.get("admin_email")}
+        if ndjson:
+            yield ndjson_line(item)
+        else:
+            yield (b"," if count else b"") + orjson.dumps(item)
+        count += 1
+    next_cursor = _encode_cursor(sort, last) if count == limit else None
+    if ndjson:
+        yield ndjson_line({"next_cursor": next_cursor})
+    else:
+        yield b'],"next_cursor":' + orjson.dumps(next_cursor) + b"}"
+
+
+@router.get("/list")
+async def list_orgs(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    sort: Literal["name", "id"] = "name",
+    prefix: str | None = Query(None, min_length=1, max_length=64, pattern=r"^[A-Za-z0-9 _\-\.\&]+$"),
+    format: Literal["json", "ndjson"] = "json",
+    admin=Depends(require_operator),
+):
+    """
+    List organizations with keyset pagination (operators only: it enumerates
+    every tenant, admin emails included). Pass the returned `next_cursor`
+    as `cursor` to get the next page; it is null on the last page. `prefix`
+    filters on the start of the name (case-sensitive). `format=ndjson` streams
+    one org per line followed by a `{"next_cursor": ...}` line.
+    """
+    after = None
+    if cursor is not None:
+        after = _decode_cursor(cursor, sort)
+        if after is None:
+            return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Invalid cursor"})
+    orgs = OrgService.iter_orgs(sort=sort, after=after, prefix=prefix, limit=limit)
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(_list_stream(orgs, sort, limit, format == "ndjson"), media_type=media_type)
+
+
+def _job_accepted(job: dict) -> ORJSONResponse:
+    job_id = str(job["_id"])
+    return ORJSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content={"job_id": job_id, "status": job["status"], "status_url": f"/jobs/{job_id}"},
+        headers={"Location": f"/jobs/{job_id}"},
+    )
 
 
-@router.put("/update", status_code=status.HTTP_200_OK)
-def update_org(current_name: str, new_name: str, admin=Depends(require_admin)):
+@router.put("/update", status_code=status.HTTP_202_ACCEPTED)
+async def update_org(current_name: str, new_name: str, admin=Depends(require_admin)):
     """
-    Rename organization (requires admin token).
+    Rename organization (requires admin token). Runs as a background job;
+    poll the returned status_url (GET /jobs/{job_id}) for progress and result.
     Request example query params:
     - current_name=old_org
     - new_name=new_org
@@ -40,18 +245,29 @@ def update_org(current_name: str, new_name: str, admin=Depends(require_admin)):
     # ensure the caller belongs to the same org
     if admin.get("org") != current_name and admin.get("org") != new_name:
         # admin token must be for same org being changed (either current or new if allowed)
-        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not authorized for this org"})
-    res = OrgService.update_org_name(current_name.strip(), new_name.strip())
-    return JSONResponse(status_code=status.HTTP_200_OK, content=res)
+        return ORJSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not authorized for this org"})
+    current_name, new_name = current_name.strip(), new_name.strip()
+    if await OrgService.get_org_by_name(new_name):
+        return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "New organization name already exists"})
+    # the target name is locked too: two renames to the same name run one after the other
+    job = await enqueue_org_job(
+        "org_rename", current_name, {"current_name": current_name, "new_name": new_name}, admin,
+        also_lock=(new_name,),
+    )
+    return _job_accepted(job)
 
 
-@router.delete("/delete", status_code=status.HTTP_200_OK)
-def delete_org(org_name: str, admin=Depends(require_admin)):
+@router.delete("/delete", status_code=status.HTTP_202_ACCEPTED)
+async def delete_org(org_name: str, admin=Depends(require_admin)):
     """
-    Delete organization and related data (requires admin token).
+    Delete organization and related data (requires admin token). Runs as a
+    background job; poll the returned status_url for the result. The org's
+    admins, the caller included, go with it: once the job has succeeded their
+    tokens are refused, so the status_url answers 401 from then on.
     """
     # check admin belongs to same org
     if admin.get("org") != org_name:
-        return JSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not authorized for this org"})
-    res = OrgService.delete_org(org_name.strip())
-    return JSONResponse(status_code=status.HTTP_200_OK, content=res)
+        return ORJSONResponse(status_code=status.HTTP_403_FORBIDDEN, content={"detail": "Not authorized for this org"})
+    org_name = org_name.strip()
+    job = await enqueue_org_job("org_delete", org_name, {"org_name": org_name}, admin)
+    return _job_accepted(job)
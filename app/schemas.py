@@ -23,11 +23,33 @@ class OrgMeta(BaseModel):
     admin_email: EmailStr | None = None
 
 
+class OrgGetManyRequest(BaseModel):
+    names: list[str] = Field(min_length=1, max_length=500)
+
+
+class OrgGetManyResponse(BaseModel):
+    orgs: dict[str, OrgMeta]
+    missing: list[str]
+
+
 class AdminLoginRequest(BaseModel):
     email: EmailStr
     password: str
 
 
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(min_length=1)
+
+
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: int
+    refresh_token: str
+
+
+class ProfilingRequest(BaseModel):
+    enabled: bool
+    sample_rate: float | None = Field(default=None, ge=0.0, le=1.0)
+    slow_ms: float | None = Field(default=None, ge=0.0)
+    duration_seconds: int | None = Field(default=None, gt=0)
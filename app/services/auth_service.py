@@ -1,44 +1,215 @@
+import hashlib
+import secrets
+import time
+from collections.abc import Sequence
+from datetime import datetime, timedelta, UTC
+from bson import ObjectId
 from fastapi import HTTPException, status, Depends
-from ..utils.hashing import verify_password
-from ..utils.jwt import create_access_token, decode_access_token
-from ..database import get_master_db
+from ..utils.hashing import HashingPoolBusy, hash_password_async, needs_rehash, verify_password_async
+from ..utils.metrics import REGISTRY
+from ..utils.rate_limit import get_login_rate_limiter
+from ..utils.jwt import TokenError, create_access_token, decode_access_token
+from ..utils.cache import TTLCache
+from ..utils.invalidation import get_invalidation_bus
+from ..database import get_master_db, org_name_key
 from ..config import settings
-from jose import JWTError
+
+PASSWORD_REHASHES = REGISTRY.counter(
+    "password_rehash_total", "Stored password hashes upgraded to BCRYPT_ROUNDS on login"
+)
+
+# decoded claims keyed by sha256(token), so repeat requests skip the signature check
+TOKEN_CACHE_CHANNEL = "admin_token"
+token_cache = TTLCache("admin_token", max_size=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+
+
+def _evict_tokens(key: str):
+    """
+    Invalidation messages are "admin:<admin_id>" or "org:<name_key>".
+    """
+    kind, _, value = key.partition(":")
+    if kind == "admin":
+        token_cache.evict_where(lambda claims: claims["admin_id"] == value)
+    elif kind == "org":
+        token_cache.evict_where(lambda claims: org_name_key(claims["org"]) == value)
+
+
+get_invalidation_bus().subscribe(TOKEN_CACHE_CHANNEL, _evict_tokens)
+
+_dummy_password_hash: str | None = None
+
+
+def _refresh_digest(token: str) -> str:
+    # refresh tokens are 256-bit random strings, so a fast hash is enough
+    return hashlib.sha256(token.encode()).hexdigest()
+
 
 class AuthService:
     ADM_COLL = "admins"
     ORG_COLL = "organizations"
+    REFRESH_COLL = "refresh_tokens"
 
     @classmethod
-    def authenticate_admin(cls, email: str, password: str) -> dict:
-        db = get_master_db()
-        admins = db[cls.ADM_COLL]
-        admin = admins.find_one({"email": email})
-        if not admin:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        if not verify_password(password, admin["password"]):
+    async def _find_admin_with_org(cls, match: dict, fields: dict) -> dict | None:
+        """
+        One admin and its org metadata (as `org_meta`, a list of at most one) in a
+        single round trip, projected down to `fields` plus the org name/collection.
+        """
+        pipeline = [
+            {"$match": match},
+            {"$limit": 1},
+            {"$lookup": {"from": cls.ORG_COLL, "localField": "org", "foreignField": "name", "as": "org_meta"}},
+            {"$project": {**fields, "org_meta.name": 1, "org_meta.collection": 1}},
+        ]
+        cursor = await get_master_db()[cls.ADM_COLL].aggregate(pipeline)
+        try:
+            return await anext(cursor, None)
+        finally:
+            await cursor.close()
+
+    @classmethod
+    async def _unknown_user_hash(cls) -> str:
+        # verified against for unknown emails so they cost the same time as a wrong password
+        global _dummy_password_hash
+        if _dummy_password_hash is None or needs_rehash(_dummy_password_hash):
+            _dummy_password_hash = await hash_password_async(secrets.token_urlsafe(16))
+        return _dummy_password_hash
+
+    @classmethod
+    async def authenticate_admin(cls, email: str, password: str, client_ip: str = "unknown") -> dict:
+        limiter = get_login_rate_limiter()
+        if limiter is not None:
+            # rejected here, before any DB or bcrypt work
+            await limiter.check(client_ip, email)
+        admin = await cls._find_admin_with_org({"email": email}, {"password": 1})
+        stored_hash = admin["password"] if admin else await cls._unknown_user_hash()
+        if not await verify_password_async(password, stored_hash) or not admin:
+            if limiter is not None:
+                await limiter.record_failure(client_ip, email)
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-        # fetch org name from admin doc
-        org_name = admin.get("org")
-        # get org collection from organizations master
-        org = db[cls.ORG_COLL].find_one({"name": org_name})
-        if not org:
+        if not admin["org_meta"]:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Org metadata missing")
+        if needs_rehash(admin["password"]):
+            await cls._rehash_password(admin, password)
+        org = admin["org_meta"][0]
+        return await cls._issue_tokens(admin["_id"], org)
+
+    @classmethod
+    async def _rehash_password(cls, admin: dict, password: str):
+        """
+        Re-hash at the configured cost while the plaintext is at hand. Best effort:
+        a busy pool just leaves it for the next login.
+        """
+        try:
+            new_hash = await hash_password_async(password)
+        except HashingPoolBusy:
+            return
+        # compare-and-set so a concurrent password change is never overwritten
+        res = await get_master_db()[cls.ADM_COLL].update_one(
+            {"_id": admin["_id"], "password": admin["password"]}, {"$set": {"password": new_hash}}
+        )
+        if res.modified_count:
+            PASSWORD_REHASHES.inc()
+
+    @classmethod
+    async def _issue_tokens(cls, admin_id: ObjectId, org: dict, family: ObjectId | None = None) -> dict:
+        """
+        New access token plus a new refresh token in `family` (a new family on login).
+        """
         payload = {
-            "admin_id": str(admin["_id"]),
+            "admin_id": str(admin_id),
             "org": org["name"],
             "collection": org["collection"],
         }
-        token = create_access_token(payload)
-        return {"access_token": token, "token_type": "bearer"}
+        refresh_token = secrets.token_urlsafe(32)
+        now = datetime.now(UTC)
+        await get_master_db()[cls.REFRESH_COLL].insert_one(
+            {
+                "_id": _refresh_digest(refresh_token),
+                "family": family or ObjectId(),
+                "admin_id": admin_id,
+                "used_at": None,
+                "created_at": now,
+                "expires_at": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            }
+        )
+        return {
+            "access_token": create_access_token(payload),
+            "token_type": "bearer",
+            "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "refresh_token": refresh_token,
+        }
 
     @classmethod
-    def get_current_admin_from_token(cls, token: str) -> dict:
+    async def refresh(cls, refresh_token: str) -> dict:
+        """
+        Trade a refresh token for a new access/refresh pair without bcrypt. Each
+        refresh token is single use; presenting a used one revokes its family.
+        """
+        tokens = get_master_db()[cls.REFRESH_COLL]
+        digest = _refresh_digest(refresh_token)
+        now = datetime.now(UTC)
+        # mark used atomically so two concurrent refreshes cannot both succeed
+        doc = await tokens.find_one_and_update(
+            {"_id": digest, "used_at": None, "expires_at": {"$gt": now}},
+            {"$set": {"used_at": now}},
+        )
+        if doc is None:
+            stale = await tokens.find_one({"_id": digest}, {"family": 1, "used_at": 1})
+            if stale is not None and stale["used_at"] is not None:
+                # replayed token: the family may be in someone else's hands
+                await tokens.delete_many({"family": stale["family"]})
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
+        # re-read admin and org so deletes and renames take effect on refresh
+        admin = await cls._find_admin_with_org({"_id": doc["admin_id"]}, {"_id": 1})
+        if not admin or not admin["org_meta"]:
+            await tokens.delete_many({"family": doc["family"]})
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+        return await cls._issue_tokens(doc["admin_id"], admin["org_meta"][0], family=doc["family"])
+
+    @classmethod
+    async def revoke_refresh_tokens(cls, admin_ids: list[str]):
+        await get_master_db()[cls.REFRESH_COLL].delete_many(
+            {"admin_id": {"$in": [ObjectId(a) for a in admin_ids]}}
+        )
+
+    @classmethod
+    async def get_current_admin_from_token(cls, token: str) -> dict:
+        """
+        Claims of a valid access token. Verified tokens are cached; a cache miss
+        also checks that the admin still exists, so once revoke_tokens has evicted
+        a deleted admin's tokens they are refused rather than cached again.
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+        cached = token_cache.get(digest)
+        if cached is not None:
+            return dict(cached)
         try:
             payload = decode_access_token(token)
-        except JWTError:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        except TokenError as e:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from e
         # basic checks
-        if "admin_id" not in payload or "org" not in payload:
+        if "admin_id" not in payload or "org" not in payload or not ObjectId.is_valid(payload["admin_id"]):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token payload")
-        return payload
+        if not await get_master_db()[cls.ADM_COLL].find_one({"_id": ObjectId(payload["admin_id"])}, {"_id": 1}):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+        # cache no longer than the token itself is valid
+        ttl = settings.TOKEN_CACHE_TTL_SECONDS
+        if "exp" in payload:
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            token_cache.set(digest, payload, ttl=ttl)
+        return dict(payload)
+
+    @classmethod
+    async def revoke_tokens(cls, admin_ids: Sequence[str] = (), org_name: str | None = None):
+        """
+        Evict cached tokens of deleted admins / orgs on every worker. Call after
+        the admins are deleted: the next use of a token re-checks the admin.
+        """
+        bus = get_invalidation_bus()
+        for admin_id in admin_ids:
+            await bus.publish(TOKEN_CACHE_CHANNEL, f"admin:{admin_id}")
+        if org_name is not None:
+            await bus.publish(TOKEN_CACHE_CHANNEL, f"org:{org_name_key(org_name)}")
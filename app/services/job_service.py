@@ -0,0 +1,391 @@
+import asyncio
+import logging
+import time
+from datetime import UTC, datetime, timedelta
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ..config import settings
+from ..database import get_master_db, org_name_key
+from .org_service import OrgService
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def _now() -> datetime:
+    return datetime.now(UTC)
+
+
+class JobContext:
+    """
+    Handed to job handlers so long operations can report progress.
+    Writes are throttled to one per second.
+    """
+
+    def __init__(self, job_id: ObjectId):
+        self.job_id = job_id
+        self._last_report = 0.0
+
+    async def report(self, progress: dict, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_report < 1.0:
+            return
+        self._last_report = now
+        await get_master_db()[JobService.JOBS_COLL].update_one(
+            {"_id": self.job_id}, {"$set": {"progress": progress, "updated_at": _now()}}
+        )
+
+
+async def _run_org_rename(params: dict, ctx: JobContext) -> dict:
+    return await OrgService.update_org_name(params["current_name"], params["new_name"], progress=ctx.report)
+
+
+async def _run_org_delete(params: dict, ctx: JobContext) -> dict:
+    return await OrgService.delete_org(params["org_name"])
+
+
+JOB_HANDLERS = {
+    "org_rename": _run_org_rename,
+    "org_delete": _run_org_delete,
+}
+
+
+class JobService:
+    JOBS_COLL = "jobs"
+    LOCKS_COLL = "job_locks"
+
+    @classmethod
+    async def enqueue(
+        cls, job_type: str, tenant: str, params: dict, requested_by: str | None = None, also_lock: tuple = ()
+    ) -> dict:
+        """
+        `also_lock` names further org names the job must hold while it runs (a
+        rename's target), so two jobs never claim the same name at once.
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"unknown job type: {job_type}")
+        now = _now()
+        job = {
+            "type": job_type,
+            "tenant": org_name_key(tenant),
+            # sorted, so two jobs locking the same pair always take them in the same order
+            "locks": sorted({org_name_key(tenant), *(org_name_key(n) for n in also_lock)}),
+            "params": params,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": settings.JOB_MAX_ATTEMPTS,
+            "requested_by": requested_by,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "run_after": now,
+            "created_at": now,
+            "updated_at": now,
+        }
+        res = await get_master_db()[cls.JOBS_COLL].insert_one(job)
+        job["_id"] = res.inserted_id
+        get_job_worker().notify()
+        return job
+
+    @classmethod
+    async def get_job(cls, job_id: str) -> dict | None:
+        if not ObjectId.is_valid(job_id):
+            return None
+        job: dict | None = await get_master_db()[cls.JOBS_COLL].find_one({"_id": ObjectId(job_id)})
+        return job
+
+    @staticmethod
+    def serialize(job: dict) -> dict:
+        def iso(value):
+            return value.isoformat() if isinstance(value, datetime) else value
+
+        return {
+            "job_id": str(job["_id"]),
+            "type": job["type"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "progress": job.get("progress"),
+            "result": job.get("result"),
+            "error": job.get("error"),
+            "created_at": iso(job.get("created_at")),
+            "started_at": iso(job.get("started_at")),
+            "finished_at": iso(job.get("finished_at")),
+        }
+
+    @classmethod
+    async def _acquire_tenant_lock(cls, tenant: str, job_id: ObjectId) -> bool:
+        locks = get_master_db()[cls.LOCKS_COLL]
+        now = _now()
+        # a lock left behind by a crashed worker is released once its lease runs out
+        await locks.delete_one({"_id": tenant, "expires_at": {"$lt": now}})
+        try:
+            await locks.insert_one(
+                {"_id": tenant, "job_id": job_id, "expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS)}
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    @classmethod
+    async def _release_tenant_lock(cls, tenant: str, job_id: ObjectId):
+        await get_master_db()[cls.LOCKS_COLL].delete_one({"_id": tenant, "job_id": job_id})
+
+    @staticmethod
+    def _locks(job: dict) -> list[str]:
+        # jobs queued before "locks" existed only lock their own tenant
+        return job.get("locks") or [job["tenant"]]
+
+    @classmethod
+    async def _acquire_job_locks(cls, job: dict) -> bool:
+        """
+        All of the job's locks or none: on the first one held elsewhere, the
+        ones taken so far are released again.
+        """
+        taken: list[str] = []
+        for key in cls._locks(job):
+            if not await cls._acquire_tenant_lock(key, job["_id"]):
+                for held in taken:
+                    await cls._release_tenant_lock(held, job["_id"])
+                return False
+            taken.append(key)
+        return True
+
+    @classmethod
+    async def _release_job_locks(cls, job: dict):
+        for key in cls._locks(job):
+            await cls._release_tenant_lock(key, job["_id"])
+
+    @classmethod
+    async def claim_next(cls) -> dict | None:
+        """
+        Claim the oldest runnable job whose tenant (and, for a rename, target
+        name) has no other job running.
+        """
+        jobs = get_master_db()[cls.JOBS_COLL]
+        now = _now()
+        await cls._requeue_expired(now)
+        cursor = jobs.find({"status": QUEUED, "run_after": {"$lte": now}}).sort("created_at", 1).limit(50)
+        async for candidate in cursor:
+            if not await cls._acquire_job_locks(candidate):
+                continue
+            job: dict | None = await jobs.find_one_and_update(
+                {"_id": candidate["_id"], "status": QUEUED},
+                {
+                    "$set": {
+                        "status": RUNNING,
+                        "started_at": now,
+                        "updated_at": now,
+                        "lease_until": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is None:
+                # another worker claimed it first
+                await cls._release_job_locks(candidate)
+                continue
+            return job
+        return None
+
+    @classmethod
+    async def _requeue_expired(cls, now: datetime):
+        # running jobs whose worker stopped renewing the lease are retried
+        jobs = get_master_db()[cls.JOBS_COLL]
+        expired = {"status": RUNNING, "lease_until": {"$lt": now}}
+        await jobs.update_many(
+            {**expired, "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+            {"$set": {"status": QUEUED, "run_after": now, "updated_at": now}},
+        )
+        await jobs.update_many(
+            expired,
+            {"$set": {"status": FAILED, "error": "worker lease expired", "finished_at": now, "updated_at": now}},
+        )
+
+    @staticmethod
+    def _owned(job: dict) -> dict:
+        # this run's claim; a re-claim after the lease expired bumps attempts
+        return {"_id": job["_id"], "status": RUNNING, "attempts": job["attempts"]}
+
+    @classmethod
+    async def renew_lease(cls, job: dict) -> bool:
+        """False once the job is no longer this run's (requeued or re-claimed)."""
+        until = _now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+        db = get_master_db()
+        res = await db[cls.JOBS_COLL].update_one(cls._owned(job), {"$set": {"lease_until": until}})
+        if not res.matched_count:
+            return False
+        await db[cls.LOCKS_COLL].update_many(
+            {"_id": {"$in": cls._locks(job)}, "job_id": job["_id"]}, {"$set": {"expires_at": until}}
+        )
+        return True
+
+    @classmethod
+    async def complete(cls, job: dict, result: dict):
+        now = _now()
+        res = await get_master_db()[cls.JOBS_COLL].update_one(
+            cls._owned(job),
+            {"$set": {"status": SUCCEEDED, "result": result, "error": None, "finished_at": now, "updated_at": now}},
+        )
+        # the locks carry the job id, not the attempt: a newer run may hold them
+        if res.matched_count:
+            await cls._release_job_locks(job)
+
+    @classmethod
+    async def fail(cls, job: dict, error: str, retry: bool):
+        now = _now()
+        update = {"error": error, "updated_at": now}
+        if retry and job["attempts"] < job["max_attempts"]:
+            backoff = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+            update.update({"status": QUEUED, "run_after": now + timedelta(seconds=backoff)})
+        else:
+            update.update({"status": FAILED, "finished_at": now})
+        res = await get_master_db()[cls.JOBS_COLL].update_one(cls._owned(job), {"$set": update})
+        if res.matched_count:
+            await cls._release_job_locks(job)
+
+
+class JobWorker:
+    """
+    Polls the jobs collection and runs up to `concurrency` jobs at once on the
+    current event loop. Runs inside the API process (JOB_WORKER_ENABLED) or
+    beside it via `python -m app.worker`.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._sem = asyncio.Semaphore(concurrency)
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+
+    def notify(self):
+        self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self._sem.acquire()
+                job = await JobService.claim_next()
+                if job is None:
+                    self._sem.release()
+                    await self._wait()
+                    continue
+                task = asyncio.create_task(self._run(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._sem.release()
+                logger.warning("job worker poll failed: %s", e)
+                await asyncio.sleep(self.poll_interval)
+
+    async def _wait(self):
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _heartbeat(self, job: dict):
+        """
+        Renews the lease until cancelled. Failed renewals are retried; returns
+        once the lease is lost, i.e. it ran out or the job was re-claimed.
+        """
+        expires = time.monotonic() + settings.JOB_LEASE_SECONDS
+        while True:
+            await asyncio.sleep(min(settings.JOB_LEASE_SECONDS / 3, max(0.0, expires - time.monotonic())))
+            started = time.monotonic()
+            try:
+                renewed = await asyncio.wait_for(JobService.renew_lease(job), timeout=max(0.0, expires - started))
+                if not renewed:
+                    return
+                expires = started + settings.JOB_LEASE_SECONDS
+            except Exception as e:
+                logger.warning("job %s lease renewal failed: %r", job["_id"], e)
+            if time.monotonic() >= expires:
+                return
+
+    async def _execute(self, job: dict):
+        try:
+            handler = JOB_HANDLERS[job["type"]]
+            result = await handler(job["params"], JobContext(job["_id"]))
+            await JobService.complete(job, result)
+        except HTTPException as e:
+            # client errors (org gone, name taken) will not fix themselves
+            await JobService.fail(job, str(e.detail), retry=e.status_code >= 500)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception("job %s failed", job["_id"])
+            await JobService.fail(job, repr(e), retry=True)
+
+    async def _run(self, job: dict):
+        work = asyncio.create_task(self._execute(job))
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await asyncio.wait((work, heartbeat), return_when=asyncio.FIRST_COMPLETED)
+            if not work.done():
+                # another worker may pick the job up now; this run must not write anything more
+                logger.error("job %s lost its lease, cancelling it", job["_id"])
+        finally:
+            work.cancel()
+            heartbeat.cancel()
+            await asyncio.gather(work, heartbeat, return_exceptions=True)
+            self._sem.release()
+            # a finished job may unblock the next one for the same tenant
+            self.notify()
+
+
+_worker: JobWorker | None = None
+
+
+def get_job_worker() -> JobWorker:
+    global _worker
+    if _worker is None:
+        _worker = JobWorker(settings.JOB_WORKER_CONCURRENCY, settings.JOB_POLL_INTERVAL_SECONDS)
+    return _worker
+
+
+async def stop_job_worker():
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+    _worker = None
+
+
+async def enqueue_org_job(job_type: str, org_name: str, params: dict, admin: dict, also_lock: tuple = ()) -> dict:
+    """
+    Validate up front what can be checked cheaply, then queue the job.
+    """
+    if not await OrgService.get_org_by_name(org_name):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
+    return await JobService.enqueue(
+        job_type, org_name, params, requested_by=admin.get("admin_id"), also_lock=also_lock
+    )
@@ -1,43 +1,81 @@
-from pymongo.errors import DuplicateKeyError
+import asyncio
+import time
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
 from fastapi import HTTPException, status
-from ..database import get_master_db, tenant_collection_name, create_tenant_collection, sanitize_org_name
-from ..utils.hashing import hash_password
+from ..database import (
+    DUPLICATE_KEY,
+    NAMESPACE_EXISTS,
+    NAMESPACE_NOT_FOUND,
+    collection_exists,
+    create_tenant_collection,
+    get_master_db,
+    get_tenant_db,
+    org_name_key,
+    tenant_collection_name,
+)
+from ..indexes import clone_indexes, create_tenant_indexes
+from ..utils.hashing import HashingPoolBusy, get_hashing_executor, hash_password_async
+from ..utils.cache import TTLCache
+from ..utils.invalidation import get_invalidation_bus
+from ..config import settings
+from .auth_service import AuthService
+from .tenant_copy import clear_checkpoint, copy_collection, has_checkpoint
 from bson import ObjectId
 
+# org metadata keyed by name_key; invalidated across workers on rename/delete
+ORG_CACHE_CHANNEL = "org_meta"
+org_cache = TTLCache("org_meta", max_size=settings.ORG_CACHE_SIZE, ttl=settings.ORG_CACHE_TTL_SECONDS)
+get_invalidation_bus().subscribe(ORG_CACHE_CHANNEL, org_cache.pop)
+
+
 class OrgService:
     MASTER_ORG_COLL = "organizations"
     MASTER_ADMIN_COLL = "admins"
+    ORG_META_PROJECTION = {"_id": 0, "name": 1, "collection": 1, "admin_email": 1, "admin_id": 1}
+
+    @classmethod
+    async def invalidate_org(cls, org_name: str):
+        await get_invalidation_bus().publish(ORG_CACHE_CHANNEL, org_name_key(org_name))
 
     @classmethod
-    def create_org(cls, org_name: str, email: str, password: str) -> dict:
+    async def create_org(cls, org_name: str, email: str, password: str) -> dict:
         db = get_master_db()
         orgs = db[cls.MASTER_ORG_COLL]
         admins = db[cls.MASTER_ADMIN_COLL]
 
         # ensure unique org name (case-insensitive)
-        if orgs.find_one({"name": {"$regex": f"^{org_name}$", "$options": "i"}}):
+        if await orgs.find_one({"name_key": org_name_key(org_name)}, {"_id": 1}):
             raise HTTPException(status_code=400, detail="Organization already exists")
 
         coll_name = tenant_collection_name(org_name)
-        create_tenant_collection(org_name)
+        tenant_coll = await create_tenant_collection(org_name)
+        await create_tenant_indexes(tenant_coll)
 
-        hashed = hash_password(password)
+        hashed = await hash_password_async(password)
         admin_doc = {
             "email": email,
             "password": hashed,
             "org": org_name
         }
         try:
-            admin_res = admins.insert_one(admin_doc)
-        except DuplicateKeyError:
-            raise HTTPException(status_code=400, detail="Admin email already used")
+            admin_res = await admins.insert_one(admin_doc)
+        except DuplicateKeyError as e:
+            raise HTTPException(status_code=400, detail="Admin email already used") from e
 
         org_doc = {
             "name": org_name,
+            "name_key": org_name_key(org_name),
             "collection": coll_name,
-            "admin_id": str(admin_res.inserted_id)
+            "db": tenant_coll.database.name,
+            "admin_id": str(admin_res.inserted_id),
+            "admin_email": email
         }
-        org_res = orgs.insert_one(org_doc)
+        try:
+            org_res = await orgs.insert_one(org_doc)
+        except DuplicateKeyError as e:
+            # lost a race with a concurrent create of the same name
+            await admins.delete_one({"_id": admin_res.inserted_id})
+            raise HTTPException(status_code=400, detail="Organization already exists") from e
 
         return {
             "name": org_doc["name"],
@@ -47,94 +85,373 @@ class OrgService:
         }
 
     @classmethod
-    def get_org_by_name(cls, org_name: str) -> dict | None:
+    async def bulk_create(cls, rows: list[dict], seen_names: set, seen_emails: set) -> list[dict]:
+        """
+        Create a batch of orgs. Each row is {"index", "name", "email", "password"};
+        returns one result per row, in order. Names/emails already in `seen_*`
+        (earlier rows of the same request) are rejected as duplicates, and the sets
+        are updated. Rows fail independently; nothing here raises for a single row.
+        """
+        db = get_master_db()
+        orgs = db[cls.MASTER_ORG_COLL]
+        admins = db[cls.MASTER_ADMIN_COLL]
+        order = [row["index"] for row in rows]
+        results: dict[int, dict] = {}
+
+        def fail(row, error):
+            results[row["index"]] = {"index": row["index"], "name": row["name"], "status": "error", "error": error}
+
+        # dedupe within the request. Emails are compared as validated (EmailStr
+        # lowercases the domain only), the same value the lookup, the insert and
+        # the unique index on admins.email see
+        pending = []
+        for row in rows:
+            key, email = org_name_key(row["name"]), row["email"]
+            if key in seen_names:
+                fail(row, "Duplicate organization in request")
+            elif email in seen_emails:
+                fail(row, "Duplicate admin email in request")
+            else:
+                seen_names.add(key)
+                seen_emails.add(email)
+                pending.append(row)
+
+        # one $in per collection for existing names and emails
+        keys = [org_name_key(row["name"]) for row in pending]
+        emails = [row["email"] for row in pending]
+        taken_names = {d["name_key"] async for d in orgs.find({"name_key": {"$in": keys}}, {"_id": 0, "name_key": 1})}
+        taken_emails = {d["email"] async for d in admins.find({"email": {"$in": emails}}, {"_id": 0, "email": 1})}
+        rows, pending = pending, []
+        for row in rows:
+            if org_name_key(row["name"]) in taken_names:
+                fail(row, "Organization already exists")
+            elif row["email"] in taken_emails:
+                fail(row, "Admin email already used")
+            else:
+                pending.append(row)
+
+        # hash in parallel, but no more at once than the pool has workers, so the
+        # batch never trips the pool's backpressure for other requests
+        sem = asyncio.Semaphore(get_hashing_executor().workers)
+
+        async def hash_row(row):
+            async with sem:
+                try:
+                    row["hashed"] = await hash_password_async(row["password"])
+                except HashingPoolBusy:
+                    fail(row, "Server busy, retry later")
+
+        await asyncio.gather(*(hash_row(row) for row in pending))
+        pending = [row for row in pending if "hashed" in row]
+
+        # admins first: org docs reference the admin _id
+        admin_docs = [{"email": row["email"], "password": row["hashed"], "org": row["name"]} for row in pending]
+        failed = await cls._insert_unordered(admins, admin_docs)
+        for i in sorted(failed):
+            fail(pending[i], "Admin email already used")
+        inserted = [(row, doc) for i, (row, doc) in enumerate(zip(pending, admin_docs, strict=True)) if i not in failed]
+
+        tenant_db_name = get_tenant_db().name
+        org_docs = [
+            {
+                "name": row["name"],
+                "name_key": org_name_key(row["name"]),
+                "collection": tenant_collection_name(row["name"]),
+                "db": tenant_db_name,
+                "admin_id": str(admin["_id"]),
+                "admin_email": row["email"],
+            }
+            for row, admin in inserted
+        ]
+        failed = await cls._insert_unordered(orgs, org_docs)
+        if failed:
+            # lost a race with a concurrent create of the same name
+            await admins.delete_many({"_id": {"$in": [inserted[i][1]["_id"] for i in failed]}})
+            for i in failed:
+                fail(inserted[i][0], "Organization already exists")
+
+        created = [(row, org) for i, ((row, _), org) in enumerate(zip(inserted, org_docs, strict=True)) if i not in failed]
+        create_sem = asyncio.Semaphore(16)
+
+        async def create_collection(name):
+            async with create_sem:
+                await create_tenant_indexes(await create_tenant_collection(name))
+
+        outcomes = await asyncio.gather(
+            *(create_collection(row["name"]) for row, _ in created), return_exceptions=True
+        )
+        broken = [org for (_, org), outcome in zip(created, outcomes, strict=True) if isinstance(outcome, Exception)]
+        if broken:
+            # same as create_org, which fails before writing anything: no org without its collection
+            await orgs.delete_many({"_id": {"$in": [org["_id"] for org in broken]}})
+            await admins.delete_many({"_id": {"$in": [ObjectId(org["admin_id"]) for org in broken]}})
+        for (row, org), outcome in zip(created, outcomes, strict=True):
+            if isinstance(outcome, Exception):
+                fail(row, "Tenant collection could not be created")
+                continue
+            results[row["index"]] = {
+                "index": row["index"],
+                "name": org["name"],
+                "status": "created",
+                "collection": org["collection"],
+                "admin_email": org["admin_email"],
+            }
+        return [results[index] for index in order]
+
+    @staticmethod
+    async def _insert_unordered(coll, docs: list[dict]) -> set[int]:
+        """
+        insert_many(ordered=False); returns the positions that failed on a
+        duplicate key. Other write errors are raised.
+        """
+        if not docs:
+            return set()
+        try:
+            await coll.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != DUPLICATE_KEY for err in errors):
+                raise
+            return {err["index"] for err in errors}
+        return set()
+
+    @classmethod
+    async def get_org_by_name(cls, org_name: str) -> dict | None:
+        key = org_name_key(org_name)
+        cached: dict | None = org_cache.get(key)
+        if cached is not None:
+            return cached
         db = get_master_db()
         orgs = db[cls.MASTER_ORG_COLL]
-        org = orgs.find_one({"name": {"$regex": f"^{org_name}$", "$options": "i"}})
+        # admin_email is denormalized onto the org doc, so this is a single read
+        # (the organizations indexes are declared in app/indexes.py and built by
+        # the IndexManager at startup)
+        org = await orgs.find_one({"name_key": key}, cls.ORG_META_PROJECTION)
         if not org:
             return None
-        # fetch admin email by admin_id
-        admin_email = None
-        admin_id = org.get("admin_id")
-        if admin_id:
-            try:
-                admin_doc = db[cls.MASTER_ADMIN_COLL].find_one({"_id": ObjectId(admin_id)})
-                if admin_doc:
-                    admin_email = admin_doc.get("email")
-            except Exception:
-                admin_email = None
+        meta = cls._org_meta(org)
+        org_cache.set(key, meta)
+        return meta
+
+    @staticmethod
+    def _org_meta(org: dict) -> dict:
         return {
             "name": org["name"],
             "collection": org["collection"],
-            "admin_email": admin_email,
+            "admin_email": org.get("admin_email"),
             "admin_id": org.get("admin_id")
         }
 
     @classmethod
-    def update_org_name(cls, current_name: str, new_name: str) -> dict:
+    async def get_orgs_by_names(cls, org_names: list[str]) -> dict:
+        """
+        Batch form of get_org_by_name: metadata keyed by name_key, for the names
+        that exist. Cached entries are served from the cache; the rest come from
+        one $in query and are cached.
+        """
+        found = {}
+        misses = []
+        for key in {org_name_key(name) for name in org_names}:
+            cached = org_cache.get(key)
+            if cached is not None:
+                found[key] = cached
+            else:
+                misses.append(key)
+        if misses:
+            projection = {**cls.ORG_META_PROJECTION, "name_key": 1}
+            cursor = get_master_db()[cls.MASTER_ORG_COLL].find({"name_key": {"$in": misses}}, projection)
+            async for org in cursor:
+                meta = cls._org_meta(org)
+                org_cache.set(org["name_key"], meta)
+                found[org["name_key"]] = meta
+        return found
+
+    @classmethod
+    async def iter_orgs(cls, sort: str = "name", after=None, prefix: str | None = None, limit: int = 100):
+        """
+        Yield up to `limit` orgs (OrgMeta fields plus the sort key) in keyset order:
+        strictly after `after` on `name` or `_id`, so every page is an index range
+        scan no matter how deep. `prefix` is a case-sensitive range on the
+        organizations.name index.
+        """
+        field = "name" if sort == "name" else "_id"
+        query: dict = {}
+        if prefix:
+            # [prefix, prefix with its last char bumped) is an index range, unlike a regex
+            query["name"] = {"$gte": prefix, "$lt": prefix[:-1] + chr(ord(prefix[-1]) + 1)}
+        if after is not None:
+            query.setdefault(field, {})["$gt"] = after
+        projection = {"_id": field == "_id", "name": 1, "collection": 1, "admin_email": 1}
+        cursor = (
+            get_master_db()[cls.MASTER_ORG_COLL]
+            .find(query, projection, batch_size=min(limit, 1000))
+            .sort(field, 1)
+            .limit(limit)
+        )
+        async for org in cursor:
+            yield org
+
+    @classmethod
+    async def update_admin_email(cls, org_name: str, new_email: str) -> dict:
+        """
+        Change an org admin's email. The admins doc and the denormalized
+        organizations.admin_email are updated together.
+        """
+        db = get_master_db()
+        orgs = db[cls.MASTER_ORG_COLL]
+        admins = db[cls.MASTER_ADMIN_COLL]
+
+        org = await orgs.find_one({"name_key": org_name_key(org_name)}, {"name": 1, "admin_id": 1})
+        if not org or not org.get("admin_id"):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
+        try:
+            res = await admins.update_one({"_id": ObjectId(org["admin_id"])}, {"$set": {"email": new_email}})
+        except DuplicateKeyError as e:
+            raise HTTPException(status_code=400, detail="Admin email already used") from e
+        if res.matched_count == 0:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin not found")
+        await orgs.update_one({"_id": org["_id"]}, {"$set": {"admin_email": new_email}})
+        await cls.invalidate_org(org["name"])
+        return {"org": org["name"], "admin_email": new_email}
+
+    @classmethod
+    async def update_org_name(cls, current_name: str, new_name: str, progress=None) -> dict:
         """
         Rename org from current_name to new_name:
         - Validate not conflicting
-        - Create new tenant collection (copy documents)
+        - Move the tenant collection: renameCollection within one database
+          (indexes move with it), otherwise a resumable streamed copy (see
+          tenant_copy) followed by cloning the source's indexes
         - Update master org doc (name & collection)
         - Update admins' org field pointing to new name
-        - Drop old tenant collection
+        - Drop old tenant collection (copy only)
+        Each step is safe to re-run, so a retried job picks up where a crashed
+        attempt stopped.
         """
         db = get_master_db()
         orgs = db[cls.MASTER_ORG_COLL]
-        admins = db[cls.MASTER_ADMIN_COLL]
 
         # find existing org
-        org = orgs.find_one({"name": {"$regex": f"^{current_name}$", "$options": "i"}})
+        org = await orgs.find_one({"name_key": org_name_key(current_name)})
         if not org:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
+            # an earlier attempt of this rename may have got past the org doc update
+            org = await orgs.find_one(
+                {"name_key": org_name_key(new_name), "renamed_from.name_key": org_name_key(current_name)}
+            )
+            if not org:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
+            old = org["renamed_from"]
+            await cls._finish_rename(old, new_name, get_tenant_db(org["db"]), org["collection"])
+            return {
+                "old_name": old["name"],
+                "new_name": org["name"],
+                "new_collection": org["collection"],
+                "strategy": "rename" if old["db"] == org["db"] else "copy",
+                "moved_docs": 0,
+                "stats": {"docs": 0, "resumed": True},
+            }
 
         # check new name not used
-        if orgs.find_one({"name": {"$regex": f"^{new_name}$", "$options": "i"}}):
+        if await orgs.find_one({"name_key": org_name_key(new_name)}, {"_id": 1}):
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="New organization name already exists")
 
         old_coll = org["collection"]
         new_coll = tenant_collection_name(new_name)
+        src_db = get_tenant_db(org.get("db", settings.MASTER_DB))
+        dest_db = get_tenant_db()
 
-        # create new collection and copy docs (safe copy)
-        src_coll = db[old_coll]
-        if new_coll in db.list_collection_names():
-            # shouldn't happen, but avoid overwrite
-            raise HTTPException(status_code=400, detail="Target collection already exists")
-
-        db.create_collection(new_coll)
-        dest_coll = db[new_coll]
-
-        # Bulk copy in chunks
-        cursor = src_coll.find({})
-        batch = []
-        BATCH_SIZE = 500
-        count = 0
-        for doc in cursor:
-            # remove _id to let Mongo create new ids
-            doc.pop("_id", None)
-            batch.append(doc)
-            if len(batch) >= BATCH_SIZE:
-                dest_coll.insert_many(batch)
-                count += len(batch)
-                batch = []
-        if batch:
-            dest_coll.insert_many(batch)
-            count += len(batch)
-
-        # update master org doc
-        orgs.update_one({"_id": org["_id"]}, {"$set": {"name": new_name, "collection": new_coll}})
+        if src_db.name == dest_db.name:
+            # same database: metadata-only renameCollection, O(1) in tenant size
+            strategy = "rename"
+            move_stats = await cls._rename_tenant_collection(src_db, old_coll, new_name)
+        else:
+            strategy = "copy"
+            # a checkpoint means an earlier attempt of this rename crashed before
+            # switching the org doc over (mid-copy or after it): resume it
+            if not await has_checkpoint(src_db, old_coll, dest_db, new_coll):
+                if await collection_exists(dest_db, new_coll):
+                    # shouldn't happen, but avoid overwrite
+                    raise HTTPException(status_code=400, detail="Target collection already exists")
+                await dest_db.create_collection(new_coll)
+            # partitioned parallel copy, keeping _ids so references survive
+            move_stats = await copy_collection(src_db, old_coll, dest_db, new_coll, progress)
+            # built once the data is in (cheaper than maintaining them per insert)
+            # and before the org doc points at the new collection
+            move_stats["indexes"] = await clone_indexes(src_db[old_coll], dest_db[new_coll])
 
+        # update master org doc; renamed_from lets a retry after this point finish the job
+        renamed_from = {
+            "name": org["name"], "name_key": org["name_key"], "collection": old_coll, "db": src_db.name,
+        }
+        try:
+            await orgs.update_one({"_id": org["_id"]}, {"$set": {"name": new_name, "name_key": org_name_key(new_name), "collection": new_coll, "db": dest_db.name, "renamed_from": renamed_from}})
+        except DuplicateKeyError as e:
+            # the name was taken after the check above (e.g. by /org/create, which
+            # does not go through the job locks): put the data back where the org doc points
+            if strategy == "rename":
+                await src_db[new_coll].rename(old_coll)
+            else:
+                await dest_db.drop_collection(new_coll)
+                await clear_checkpoint(src_db, old_coll, dest_db, new_coll)
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="New organization name already exists") from e
+
+        await cls._finish_rename(renamed_from, new_name, dest_db, new_coll)
+
+        return {
+            "old_name": org["name"],
+            "new_name": new_name,
+            "new_collection": new_coll,
+            "strategy": strategy,
+            "moved_docs": move_stats["docs"],
+            "stats": move_stats,
+        }
+
+    @classmethod
+    async def _finish_rename(cls, old: dict, new_name: str, dest_db, new_coll: str):
+        """
+        Steps after the org doc points at the new name; each is safe to repeat.
+        """
         # update admins who had org reference
-        admins.update_many({"org": org["name"]}, {"$set": {"org": new_name}})
+        await get_master_db()[cls.MASTER_ADMIN_COLL].update_many({"org": old["name"]}, {"$set": {"org": new_name}})
 
-        # drop old collection
-        db.drop_collection(old_coll)
+        await cls.invalidate_org(old["name"])
 
-        return {"old_name": org["name"], "new_name": new_name, "new_collection": new_coll, "moved_docs": count}
+        if old["db"] != dest_db.name:
+            # copied: drop old collection
+            src_db = get_tenant_db(old["db"])
+            await src_db.drop_collection(old["collection"])
+            # only now: a retry before the org doc update must still find it
+            await clear_checkpoint(src_db, old["collection"], dest_db, new_coll)
+
+    @classmethod
+    async def _rename_tenant_collection(cls, db, old_coll: str, new_name: str) -> dict:
+        """
+        Safe to re-run: a retry after the rename went through but the org doc
+        update did not finds the data already under the new name.
+        """
+        start = time.perf_counter()
+        new_coll = tenant_collection_name(new_name)
+        try:
+            docs = await db[old_coll].estimated_document_count()
+            # renameCollection refuses to overwrite an existing target (no dropTarget)
+            await db[old_coll].rename(new_coll)
+        except OperationFailure as e:
+            if e.code == NAMESPACE_EXISTS:
+                # shouldn't happen, but avoid overwrite
+                raise HTTPException(status_code=400, detail="Target collection already exists") from e
+            if e.code != NAMESPACE_NOT_FOUND:
+                raise
+            if await collection_exists(db, new_coll):
+                # an earlier attempt of this job renamed it and died before the org doc update
+                docs = await db[new_coll].estimated_document_count()
+            else:
+                # tenant collection was never materialized; nothing to move
+                docs = 0
+                await create_tenant_indexes(await create_tenant_collection(new_name))
+        return {"docs": docs, "seconds": round(time.perf_counter() - start, 3)}
 
     @classmethod
-    def delete_org(cls, org_name: str) -> dict:
+    async def delete_org(cls, org_name: str) -> dict:
         """
         Deletes an organization and its tenant collection and admins.
         """
@@ -142,19 +459,25 @@ class OrgService:
         orgs = db[cls.MASTER_ORG_COLL]
         admins = db[cls.MASTER_ADMIN_COLL]
 
-        org = orgs.find_one({"name": {"$regex": f"^{org_name}$", "$options": "i"}})
+        org = await orgs.find_one({"name_key": org_name_key(org_name)})
         if not org:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Organization not found")
 
         # delete tenant collection
         coll = org.get("collection")
-        if coll and coll in db.list_collection_names():
-            db.drop_collection(coll)
+        tenant_db = get_tenant_db(org.get("db", settings.MASTER_DB))
+        if coll:
+            # dropping a missing collection is a no-op, no need to look it up first
+            await tenant_db.drop_collection(coll)
 
         # remove admins for that org
-        admins.delete_many({"org": org["name"]})
+        admin_ids = [str(a["_id"]) async for a in admins.find({"org": org["name"]}, {"_id": 1})]
+        await admins.delete_many({"org": org["name"]})
 
         # remove org doc
-        orgs.delete_one({"_id": org["_id"]})
+        await orgs.delete_one({"_id": org["_id"]})
+        await cls.invalidate_org(org["name"])
+        await AuthService.revoke_tokens(admin_ids, org["name"])
+        await AuthService.revoke_refresh_tokens(admin_ids)
 
         return {"deleted": True, "org": org["name"]}
@@ -0,0 +1,172 @@
+import asyncio
+import time
+from itertools import pairwise
+
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+from pymongo.errors import BulkWriteError
+
+from ..config import settings
+from ..database import DUPLICATE_KEY, get_master_db
+
+CHECKPOINT_COLL = "tenant_copy_checkpoints"
+
+# raw documents are copied without decoding/re-encoding and expose their BSON size
+RAW_CODEC = CodecOptions(document_class=RawBSONDocument)
+
+
+def _range_filter(lo, hi) -> dict:
+    cond = {}
+    if lo is not None:
+        cond["$gte"] = lo
+    if hi is not None:
+        cond["$lt"] = hi
+    return {"_id": cond} if cond else {}
+
+
+async def _insert_batch(dest, batch: list) -> int:
+    """
+    Unordered insert that tolerates duplicate _ids, which appear when a resumed
+    partition re-sends documents written after its last checkpoint.
+    """
+    try:
+        res = await dest.insert_many(batch, ordered=False)
+        return len(res.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != DUPLICATE_KEY for err in errors):
+            raise
+        inserted: int = e.details.get("nInserted", 0)
+        return inserted
+
+
+async def _plan_partitions(src, partitions: int, batch_size: int) -> list:
+    """
+    Split the source _id space into ranges using a random sample of _ids.
+    Returns the boundaries [None, b1, ..., None]; partition i is [b_i, b_i+1).
+    """
+    total = await src.estimated_document_count()
+    if partitions <= 1 or total < batch_size * 2:
+        return [None, None]
+    sample_size = min(total, partitions * 20)
+    cursor = await src.aggregate([{"$sample": {"size": sample_size}}, {"$project": {"_id": 1}}])
+    ids = [doc["_id"] async for doc in cursor]
+    # range scans only compare within one BSON type; mixed _id types get one partition
+    if not ids or len({type(i) for i in ids}) > 1:
+        return [None, None]
+    ids = sorted(set(ids))
+    step = max(1, len(ids) // partitions)
+    bounds = ids[step::step][: partitions - 1]
+    return [None, *bounds, None]
+
+
+async def _copy_partition(src, dest, checkpoints, key: str, idx: int | None, part: dict, batch_size: int, stats: dict, progress=None):
+    """
+    Copy one _id range. With idx=None the range is not checkpointed.
+    """
+    if part.get("done"):
+        return
+    query = _range_filter(part["lo"], part["hi"])
+    if part.get("last_id") is not None:
+        # resume strictly after the last checkpointed document
+        query.setdefault("_id", {}).pop("$gte", None)
+        query["_id"]["$gt"] = part["last_id"]
+    cursor = src.find(query, batch_size=batch_size).sort("_id", 1)
+    batch: list = []
+    batch_bytes = 0
+
+    async def flush():
+        nonlocal batch, batch_bytes
+        inserted = await _insert_batch(dest, batch)
+        stats["docs"] += inserted
+        stats["bytes"] += batch_bytes
+        if idx is not None:
+            await checkpoints.update_one(
+                {"_id": key},
+                {"$set": {f"partitions.{idx}.last_id": batch[-1]["_id"]}, "$inc": {"copied": inserted}},
+            )
+        batch = []
+        batch_bytes = 0
+        if progress is not None:
+            await progress({"docs": stats["docs"], "bytes": stats["bytes"]})
+
+    async for doc in cursor:
+        batch.append(doc)
+        batch_bytes += len(doc.raw)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    if idx is not None:
+        await checkpoints.update_one({"_id": key}, {"$set": {f"partitions.{idx}.done": True}})
+
+
+def _checkpoint_key(src_db, src_name: str, dest_db, dest_name: str) -> str:
+    return f"{src_db.name}.{src_name}->{dest_db.name}.{dest_name}"
+
+
+async def copy_collection(src_db, src_name: str, dest_db, dest_name: str, progress=None) -> dict:
+    """
+    Copy src_name into dest_name (possibly in another database), keeping _ids, as
+    parallel range scans over _id with unordered bulk inserts. Progress is
+    checkpointed per partition in master `tenant_copy_checkpoints`, so calling this
+    again after a crash resumes the copy. The checkpoint outlives the copy: the
+    caller removes it with clear_checkpoint() once nothing after the copy can
+    fail, so a retry until then still finds it. Returns throughput stats.
+    """
+    src = src_db.get_collection(src_name, codec_options=RAW_CODEC)
+    dest = dest_db.get_collection(dest_name, codec_options=RAW_CODEC)
+    checkpoints = get_master_db()[CHECKPOINT_COLL]
+    key = _checkpoint_key(src_db, src_name, dest_db, dest_name)
+    batch_size = settings.TENANT_COPY_BATCH_SIZE
+
+    checkpoint = await checkpoints.find_one({"_id": key})
+    resumed = checkpoint is not None
+    if checkpoint is None:
+        bounds = await _plan_partitions(src, settings.TENANT_COPY_PARTITIONS, batch_size)
+        checkpoint = {
+            "_id": key,
+            "src": src_name,
+            "dest": dest_name,
+            "partitions": [
+                {"lo": lo, "hi": hi, "last_id": None, "done": False}
+                for lo, hi in pairwise(bounds)
+            ],
+            "copied": 0,
+        }
+        await checkpoints.insert_one(checkpoint)
+
+    stats = {"docs": 0, "bytes": 0}
+    sem = asyncio.Semaphore(settings.TENANT_COPY_CONCURRENCY)
+
+    async def run(idx: int, part: dict):
+        async with sem:
+            await _copy_partition(src, dest, checkpoints, key, idx, part, batch_size, stats, progress)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(i, p) for i, p in enumerate(checkpoint["partitions"])))
+    if await dest.estimated_document_count() < await src.estimated_document_count():
+        # range scans skip _ids of a different BSON type than the sampled bounds;
+        # sweep the whole collection, duplicates are ignored
+        sweep = {"lo": None, "hi": None, "last_id": None, "done": False}
+        await _copy_partition(src, dest, checkpoints, key, None, sweep, batch_size, stats, progress)
+    elapsed = time.perf_counter() - start
+    return {
+        "docs": stats["docs"],
+        "bytes": stats["bytes"],
+        "seconds": round(elapsed, 3),
+        "docs_per_sec": round(stats["docs"] / elapsed, 1) if elapsed else None,
+        "bytes_per_sec": round(stats["bytes"] / elapsed, 1) if elapsed else None,
+        "partitions": len(checkpoint["partitions"]),
+        "resumed": resumed,
+    }
+
+
+async def has_checkpoint(src_db, src_name: str, dest_db, dest_name: str) -> bool:
+    key = _checkpoint_key(src_db, src_name, dest_db, dest_name)
+    return await get_master_db()[CHECKPOINT_COLL].find_one({"_id": key}, {"_id": 1}) is not None
+
+
+async def clear_checkpoint(src_db, src_name: str, dest_db, dest_name: str):
+    key = _checkpoint_key(src_db, src_name, dest_db, dest_name)
+    await get_master_db()[CHECKPOINT_COLL].delete_one({"_id": key})
@@ -1,18 +1,75 @@
 """
 Pytest configuration and fixtures for tests.
 """
+import time
 import pytest
-from app.database import get_client
+from fastapi.testclient import TestClient
+from pymongo import MongoClient
+from app.config import settings
+from app.main import app
 
 
 @pytest.fixture(scope="session", autouse=True)
 def check_db_connection():
     """Check database connection at the start of test session."""
     try:
-        client = get_client()
+        client: MongoClient = MongoClient(str(settings.MONGO_URI), serverSelectionTimeoutMS=5000)
         client.admin.command("ping")
+        client.close()
     except Exception as e:
         # Log warning but don't skip - let individual tests handle it
         print(f"Warning: MongoDB connection check failed: {e}")
         print("Tests will attempt to connect individually")
 
+
+@pytest.fixture(scope="module")
+def client():
+    """
+    TestClient running the app lifespan on a single event loop for the whole module,
+    so the async Mongo client is created and used on one loop.
+    """
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="module")
+def run(client):
+    """Run a coroutine function (e.g. a service call) on the app's event loop."""
+    return client.portal.call
+
+
+@pytest.fixture(scope="module")
+def wait_for_job(client):
+    """Poll GET /jobs/{id} until the job finishes; returns the final job body."""
+    def wait(job_id: str, token: str, timeout: float = 30.0) -> dict:
+        deadline = time.monotonic() + timeout
+        while True:
+            res = client.get(f"/jobs/{job_id}", headers={"Authorization": f"Bearer {token}"})
+            assert res.status_code == 200
+            job: dict = res.json()
+            if job["status"] in ("succeeded", "failed") or time.monotonic() > deadline:
+                return job
+            time.sleep(0.05)
+    return wait
+
+
+@pytest.fixture(scope="module")
+def operator_account(client, request):
+    """An org whose admin the `operator_headers` fixture lists in OPERATOR_ADMIN_IDS."""
+    from app.services.org_service import OrgService
+
+    name = f"test_operator_{request.module.__name__.rsplit('.', 1)[-1]}"
+    email = f"{name}@example.com"
+    client.portal.call(OrgService.create_org, name, email, "testpass123")
+    token = client.post("/admin/login", json={"email": email, "password": "testpass123"}).json()["access_token"]
+    admin_id = client.portal.call(OrgService.get_org_by_name, name)["admin_id"]
+    yield token, admin_id
+    client.portal.call(OrgService.delete_org, name)
+
+
+@pytest.fixture
+def operator_headers(operator_account, monkeypatch):
+    """Authorization headers of an operator admin (see require_operator)."""
+    token, admin_id = operator_account
+    monkeypatch.setattr(settings, "OPERATOR_ADMIN_IDS", admin_id)
+    return {"Authorization": f"Bearer {token}"}
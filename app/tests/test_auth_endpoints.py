@@ -1,30 +1,36 @@
-from fastapi.testclient import TestClient
-from app.main import app
+import pytest
+from app.config import settings
 from app.database import get_master_db
+from app.services.auth_service import AuthService, token_cache
 from app.services.org_service import OrgService
+from app.utils.hashing import hash_password, hash_rounds
 
-client = TestClient(app)
 
+async def _cleanup():
+    db = get_master_db()
+    await db["admins"].delete_many({"email": {"$regex": "test_"}})
+    await db["organizations"].delete_many({"name": {"$regex": "test_"}})
 
-def teardown_module(module):
+
+@pytest.fixture(scope="module", autouse=True)
+def cleanup(run):
     """Clean up test data"""
+    yield
     try:
-        db = get_master_db()
-        db["admins"].delete_many({"email": {"$regex": "test_"}})
-        db["organizations"].delete_many({"name": {"$regex": "test_"}})
+        run(_cleanup)
     except Exception:
         # Ignore cleanup errors
         pass
 
 
-def test_admin_login_success():
+def test_admin_login_success(client, run):
     """Test successful admin login"""
     # Create org first
     org_name = "test_auth_org"
     email = "test_admin_auth@example.com"
     password = "testpass123"
     
-    OrgService.create_org(org_name, email, password)
+    run(OrgService.create_org, org_name, email, password)
     
     # Test login
     response = client.post(
@@ -38,13 +44,13 @@ def test_admin_login_success():
     assert len(data["access_token"]) > 0
 
 
-def test_admin_login_wrong_password():
+def test_admin_login_wrong_password(client, run):
     """Test login with wrong password"""
     org_name = "test_auth_org2"
     email = "test_admin_auth2@example.com"
     password = "testpass123"
     
-    OrgService.create_org(org_name, email, password)
+    run(OrgService.create_org, org_name, email, password)
     
     response = client.post(
         "/admin/login",
@@ -53,7 +59,7 @@ def test_admin_login_wrong_password():
     assert response.status_code == 401
 
 
-def test_admin_login_wrong_email():
+def test_admin_login_wrong_email(client):
     """Test login with non-existent email"""
     response = client.post(
         "/admin/login",
@@ -62,7 +68,7 @@ def test_admin_login_wrong_email():
     assert response.status_code == 401
 
 
-def test_admin_login_missing_fields():
+def test_admin_login_missing_fields(client):
     """Test login with missing fields"""
     response = client.post(
         "/admin/login",
@@ -71,7 +77,7 @@ def test_admin_login_missing_fields():
     assert response.status_code == 422
 
 
-def test_admin_login_invalid_email():
+def test_admin_login_invalid_email(client):
     """Test login with invalid email format"""
     response = client.post(
         "/admin/login",
@@ -79,3 +85,111 @@ def test_admin_login_invalid_email():
     )
     assert response.status_code == 422
 
+
+
+def test_token_cache_skips_repeat_decodes(client, run):
+    """A repeated token is served from the verified-token cache"""
+    org_name = "test_auth_token_cache"
+    email = "test_admin_token_cache@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+    token = client.post("/admin/login", json={"email": email, "password": password}).json()["access_token"]
+
+    first = run(AuthService.get_current_admin_from_token, token)
+    hits = token_cache.stats()["hits"]
+    second = run(AuthService.get_current_admin_from_token, token)
+    assert second == first
+    assert token_cache.stats()["hits"] == hits + 1
+
+
+def test_token_cache_evicted_on_org_delete(client, run):
+    """Deleting an org evicts its admins' cached tokens, and they are refused afterwards"""
+    org_name = "test_auth_token_revoke"
+    email = "test_admin_token_revoke@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+    token = client.post("/admin/login", json={"email": email, "password": password}).json()["access_token"]
+    run(AuthService.get_current_admin_from_token, token)
+    size = len(token_cache)
+
+    run(OrgService.delete_org, org_name)
+    assert len(token_cache) == size - 1
+    response = client.get("/jobs/000000000000000000000000", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert len(token_cache) == size - 1
+
+
+def test_refresh_rotates_tokens(client, run):
+    """A refresh token yields a new access token and a new refresh token"""
+    org_name = "test_auth_refresh"
+    email = "test_admin_refresh@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+    login = client.post("/admin/login", json={"email": email, "password": password}).json()
+    assert login["expires_in"] > 0
+
+    response = client.post("/admin/refresh", json={"refresh_token": login["refresh_token"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refresh_token"] != login["refresh_token"]
+    assert run(AuthService.get_current_admin_from_token, data["access_token"])["org"] == org_name
+
+
+def test_refresh_token_reuse_revokes_family(client, run):
+    """Replaying a used refresh token revokes every token issued from that login"""
+    org_name = "test_auth_refresh_reuse"
+    email = "test_admin_refresh_reuse@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+    first = client.post("/admin/login", json={"email": email, "password": password}).json()["refresh_token"]
+    second = client.post("/admin/refresh", json={"refresh_token": first}).json()["refresh_token"]
+
+    assert client.post("/admin/refresh", json={"refresh_token": first}).status_code == 401
+    assert client.post("/admin/refresh", json={"refresh_token": second}).status_code == 401
+
+
+def test_refresh_with_unknown_token(client):
+    """Test refresh with a token that was never issued"""
+    response = client.post("/admin/refresh", json={"refresh_token": "not-a-real-token"})
+    assert response.status_code == 401
+
+
+def test_login_rehashes_weaker_password_hash(client, run):
+    """A hash stored with another cost is upgraded to BCRYPT_ROUNDS on login"""
+    org_name = "test_auth_rehash"
+    email = "test_admin_rehash@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+
+    async def set_weak_hash():
+        await get_master_db()["admins"].update_one(
+            {"email": email}, {"$set": {"password": hash_password(password, rounds=4)}}
+        )
+
+    async def stored_hash():
+        return (await get_master_db()["admins"].find_one({"email": email}))["password"]
+
+    run(set_weak_hash)
+    assert client.post("/admin/login", json={"email": email, "password": password}).status_code == 200
+    assert hash_rounds(run(stored_hash)) == settings.BCRYPT_ROUNDS
+
+
+def test_login_rate_limited_after_repeated_failures(client, run):
+    """Too many failures for one email return 429 before the password is checked"""
+    org_name = "test_auth_rate_limit"
+    email = "test_admin_rate_limit@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+    for _ in range(settings.LOGIN_EMAIL_BURST):
+        response = client.post("/admin/login", json={"email": email, "password": "wrongpassword"})
+        assert response.status_code == 401
+
+    response = client.post("/admin/login", json={"email": email, "password": password})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,44 @@
+import asyncio
+import time
+
+from app.utils.cache import TTLCache
+from app.utils.invalidation import InMemoryInvalidationBus
+
+
+def test_ttl_cache_hit_and_miss():
+    cache = TTLCache("test_hit_miss", max_size=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", {"name": "A"})
+    assert cache.get("a") == {"name": "A"}
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test_lru", max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # a is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache("test_expiry", max_size=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_in_memory_bus_invalidates_subscribers():
+    cache = TTLCache("test_bus", max_size=10, ttl=60)
+    bus = InMemoryInvalidationBus()
+    bus.subscribe("org_meta", cache.pop)
+    cache.set("acme", {"name": "acme"})
+    asyncio.run(bus.publish("org_meta", "acme"))
+    assert cache.get("acme") is None
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.utils.hashing import (
+    HashingExecutor,
+    HashingPoolBusy,
+    hash_password,
+    hash_rounds,
+    needs_rehash,
+    verify_password,
+)
+
+
+def test_executor_hash_and_verify_roundtrip():
+    """Hashes produced in the pool verify in-process and vice versa"""
+    async def scenario():
+        executor = HashingExecutor(workers=1, max_pending=4, retry_after=1)
+        try:
+            hashed = await executor.run("hash", hash_password, "testpass123")
+            assert verify_password("testpass123", hashed)
+            assert await executor.run("verify", verify_password, "testpass123", hashed)
+            assert not await executor.run("verify", verify_password, "wrong", hashed)
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_executor_rejects_when_queue_full():
+    """Jobs beyond max_pending fail fast with HashingPoolBusy"""
+    async def scenario():
+        executor = HashingExecutor(workers=1, max_pending=1, retry_after=3)
+        try:
+            first = asyncio.ensure_future(executor.run("hash", hash_password, "testpass123"))
+            await asyncio.sleep(0)
+            assert executor.pending == 1
+            with pytest.raises(HashingPoolBusy) as exc:
+                await executor.run("hash", hash_password, "testpass123")
+            assert exc.value.retry_after == 3
+            await first
+            assert executor.pending == 0
+        finally:
+            executor.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_hash_rounds_and_needs_rehash():
+    """The stored cost is read back from the hash and compared to BCRYPT_ROUNDS"""
+    weak = hash_password("testpass123", rounds=4)
+    assert hash_rounds(weak) == 4
+    assert verify_password("testpass123", weak)
+    assert needs_rehash(weak) == (settings.BCRYPT_ROUNDS != 4)
+    assert not needs_rehash(hash_password("testpass123"))
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from pymongo import ASCENDING
+
+from app.database import get_master_db
+from app.indexes import IndexManager, IndexSpec, get_index_manager
+from app.utils.health import get_readiness
+
+
+def test_healthz_does_not_need_the_database(client):
+    """Liveness is answered by the process alone"""
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_readyz_waits_for_required_indexes(client, monkeypatch):
+    """Readiness reports the startup index sync and fails while required indexes are missing"""
+    manager = get_index_manager()
+    deadline = time.monotonic() + 5
+    while manager.state in ("pending", "running") and time.monotonic() < deadline:
+        time.sleep(0.05)
+    monkeypatch.setattr(get_readiness(), "cache_seconds", 0.0)
+
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["checks"] == {"mongo": "ok", "indexes": "ok"}
+    assert body["index_sync"]["indexes"]["admins.email_1"] in ("ok", "created")
+
+    monkeypatch.setitem(manager.indexes, "admins.email_1", "missing")
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["checks"]["indexes"] == manager.state
+
+
+def test_index_sync_retries_until_required_indexes_build(run):
+    """A required index that cannot build at first is retried and turns ready once it can"""
+    coll = "test_health_retry"
+    manager = IndexManager({coll: [IndexSpec([("key", ASCENDING)], required=True, unique=True)]}, True, 0.05, 0.1)
+
+    async def scenario():
+        db = get_master_db()
+        # duplicates keep the unique index from building, like legacy orgs before the backfill
+        await db[coll].insert_many([{"key": 1}, {"key": 1}])
+        manager.start()
+        deadline = time.monotonic() + 5
+        while manager.passes < 2 and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        failed = (manager.state, manager.required_ok())
+        await db[coll].delete_one({"key": 1})
+        while manager.state != "done" and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        await manager.stop()
+        await db.drop_collection(coll)
+        return failed
+
+    assert run(scenario) == ("failed", False)
+    assert manager.state == "done"
+    assert manager.required_ok()
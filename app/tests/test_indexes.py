@@ -0,0 +1,110 @@
+import pytest
+from pymongo import ASCENDING, DESCENDING
+
+from app.config import settings
+from app.database import get_master_db, get_tenant_db, tenant_collection_name
+from app.indexes import IndexSpec, apply_indexes, clone_indexes, reconcile_tenants
+from app.services.org_service import OrgService
+
+COLL = "test_indexes_coll"
+TEMPLATES = [{"keys": [["created_at", -1]]}, {"keys": [["ref", 1]], "unique": True, "sparse": True}]
+
+
+async def _cleanup():
+    db = get_master_db()
+    async for org in db["organizations"].find({"name": {"$regex": "^test_indexes"}}):
+        await get_tenant_db(org.get("db")).drop_collection(org["collection"])
+    await db["admins"].delete_many({"email": {"$regex": "test_indexes"}})
+    await db["organizations"].delete_many({"name": {"$regex": "^test_indexes"}})
+    await db.drop_collection(COLL)
+    await db.drop_collection(COLL + "_copy")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cleanup(run):
+    """Clean up test data"""
+    yield
+    try:
+        run(_cleanup)
+    except Exception:
+        # Ignore cleanup errors
+        pass
+
+
+def test_apply_indexes_is_idempotent(run):
+    """Missing indexes are created once; a second pass finds them and sends nothing"""
+    specs = [
+        IndexSpec([("slug", ASCENDING)], unique=True),
+        IndexSpec([("owner", ASCENDING), ("created_at", ASCENDING)]),
+    ]
+
+    async def scenario():
+        coll = get_master_db()[COLL]
+        try:
+            first = await apply_indexes(coll, specs)
+            second = await apply_indexes(coll, specs)
+            return first, second
+        finally:
+            await get_master_db().drop_collection(COLL)
+
+    first, second = run(scenario)
+    assert first == {"slug_1": "created", "owner_1_created_at_1": "created"}
+    assert second == {"slug_1": "ok", "owner_1_created_at_1": "ok"}
+
+
+def test_apply_indexes_reports_conflicts_and_dry_run(run):
+    """An existing index with other options is left alone; create=False only reports"""
+    async def scenario():
+        coll = get_master_db()[COLL]
+        try:
+            await coll.create_index([("slug", ASCENDING)])
+            return await apply_indexes(
+                coll,
+                [IndexSpec([("slug", ASCENDING)], unique=True), IndexSpec([("owner", ASCENDING)])],
+                create=False,
+            )
+        finally:
+            await get_master_db().drop_collection(COLL)
+
+    assert run(scenario) == {"slug_1": "conflict", "owner_1": "missing"}
+
+
+def test_new_tenant_gets_template_indexes(run, monkeypatch):
+    """Org creation builds the configured tenant index templates"""
+    monkeypatch.setattr(settings, "TENANT_INDEX_TEMPLATES", TEMPLATES)
+    run(OrgService.create_org, "test_indexes_org", "test_indexes_org@example.com", "testpass123")
+
+    info = run(lambda: get_tenant_db()[tenant_collection_name("test_indexes_org")].index_information())
+    assert list(info["created_at_-1"]["key"]) == [("created_at", -1)]
+    assert info["ref_1"]["unique"] and info["ref_1"]["sparse"]
+
+
+def test_reconcile_rolls_out_template_changes(run, monkeypatch):
+    """Existing tenants get new template indexes; a dry run only reports them"""
+    monkeypatch.setattr(settings, "TENANT_INDEX_TEMPLATES", [])
+    run(OrgService.create_org, "test_indexes_old", "test_indexes_old@example.com", "testpass123")
+    monkeypatch.setattr(settings, "TENANT_INDEX_TEMPLATES", TEMPLATES)
+    names = ["test_indexes_old"]
+
+    # --org matches names case-insensitively, like every other org lookup
+    assert run(reconcile_tenants, 4, False, [" TEST_Indexes_Old "]) == {"missing": 2}
+    seen = []
+    totals = run(reconcile_tenants, 4, True, names, lambda org, result: seen.append((org, result)))
+    assert totals == {"created": 2}
+    assert seen == [("test_indexes_old", {"created_at_-1": "created", "ref_1": "created"})]
+    assert run(reconcile_tenants, 4, True, names) == {"ok": 2}
+
+
+def test_clone_indexes_copies_keys_and_options(run):
+    """Secondary indexes are recreated on the copy with the same names and options"""
+    async def scenario():
+        db = get_master_db()
+        await db[COLL].create_index([("owner", ASCENDING), ("at", DESCENDING)], name="owner_recent")
+        await db[COLL].create_index([("code", ASCENDING)], unique=True)
+        cloned = await clone_indexes(db[COLL], db[COLL + "_copy"])
+        return cloned, await db[COLL + "_copy"].index_information()
+
+    cloned, info = run(scenario)
+    assert sorted(cloned) == ["code_1", "owner_recent"]
+    assert list(info["owner_recent"]["key"]) == [("owner", 1), ("at", -1)]
+    assert info["code_1"]["unique"]
@@ -0,0 +1,207 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.config import settings
+from app.database import get_master_db, get_tenant_db, tenant_collection_name
+from app.services.job_service import JOB_HANDLERS, JobService, JobWorker, enqueue_org_job
+from app.services.org_service import OrgService
+from app.services.tenant_copy import CHECKPOINT_COLL, copy_collection
+
+
+async def _cleanup():
+    db = get_master_db()
+    await db["admins"].delete_many({"email": {"$regex": "test_jobs"}})
+    await db["organizations"].delete_many({"name": {"$regex": "test_jobs"}})
+    await db[JobService.LOCKS_COLL].delete_many({"_id": {"$regex": "test_jobs"}})
+
+
+async def _org(name: str) -> dict:
+    org = await OrgService.get_org_by_name(name)
+    assert org is not None
+    return org
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cleanup(run):
+    """Clean up test data"""
+    yield
+    try:
+        run(_cleanup)
+    except Exception:
+        pass
+
+
+def test_job_locks_are_all_or_nothing(run):
+    """A job whose target name is held elsewhere takes none of its locks"""
+    first = {"_id": ObjectId(), "tenant": "test_jobs_a", "locks": ["test_jobs_a", "test_jobs_target"]}
+    second = {"_id": ObjectId(), "tenant": "test_jobs_b", "locks": ["test_jobs_b", "test_jobs_target"]}
+    assert run(JobService._acquire_job_locks, first)
+    assert not run(JobService._acquire_job_locks, second)
+
+    async def held():
+        cursor = get_master_db()[JobService.LOCKS_COLL].find({"_id": {"$regex": "test_jobs"}})
+        return sorted([lock["_id"] async for lock in cursor])
+
+    assert run(held) == ["test_jobs_a", "test_jobs_target"]
+    run(JobService._release_job_locks, first)
+    assert run(JobService._acquire_job_locks, second)
+    run(JobService._release_job_locks, second)
+    assert run(held) == []
+
+
+def test_two_renames_to_one_name(client, run, wait_for_job):
+    """Only one of two orgs renamed to the same name gets it; the other keeps its data"""
+    password = "testpass123"
+    tokens = {}
+    for name in ("test_jobs_one", "test_jobs_two"):
+        run(OrgService.create_org, name, f"{name}@example.com", password)
+        tokens[name] = client.post(
+            "/admin/login", json={"email": f"{name}@example.com", "password": password}
+        ).json()["access_token"]
+
+    async def seed():
+        await get_tenant_db()[tenant_collection_name("test_jobs_two")].insert_one({"doc": "two"})
+
+    run(seed)
+
+    async def enqueue_both():
+        # both queued before either runs, i.e. past the route's name check
+        job_ids = {}
+        for name in tokens:
+            admin = {"admin_id": (await _org(name))["admin_id"]}
+            job = await enqueue_org_job(
+                "org_rename", name, {"current_name": name, "new_name": "test_jobs_shared"}, admin,
+                also_lock=("test_jobs_shared",),
+            )
+            job_ids[name] = str(job["_id"])
+        return job_ids
+
+    job_ids = run(enqueue_both)
+    jobs = {name: wait_for_job(job_ids[name], tokens[name]) for name in tokens}
+    assert sorted(job["status"] for job in jobs.values()) == ["failed", "succeeded"]
+
+    loser = next(name for name, job in jobs.items() if job["status"] == "failed")
+    assert "already exists" in jobs[loser]["error"]
+
+    async def loser_state():
+        org = await _org(loser)
+        return org["collection"], await get_tenant_db()[org["collection"]].count_documents({})
+
+    expected = 1 if loser == "test_jobs_two" else 0
+    assert run(loser_state) == (tenant_collection_name(loser), expected)
+
+
+def test_rename_retry_after_collection_moved(run):
+    """A rename re-run after renameCollection, but before the org doc update, completes"""
+    run(OrgService.create_org, "test_jobs_retry", "test_jobs_retry@example.com", "testpass123")
+
+    async def crash_after_rename():
+        db = get_tenant_db()
+        await db[tenant_collection_name("test_jobs_retry")].insert_one({"doc": "kept"})
+        # what the first attempt got done before the worker died
+        await db[tenant_collection_name("test_jobs_retry")].rename(tenant_collection_name("test_jobs_retried"))
+
+    run(crash_after_rename)
+    result = run(OrgService.update_org_name, "test_jobs_retry", "test_jobs_retried")
+    assert result["strategy"] == "rename"
+    assert result["moved_docs"] == 1
+
+    async def state():
+        org = await _org("test_jobs_retried")
+        return org["collection"], await get_tenant_db()[org["collection"]].count_documents({"doc": "kept"})
+
+    assert run(state) == (tenant_collection_name("test_jobs_retried"), 1)
+
+
+def test_copy_rename_retry_after_copy_finished(run):
+    """A cross-database rename re-run after the copy, but before the org doc update, completes"""
+    run(OrgService.create_org, "test_jobs_copy", "test_jobs_copy@example.com", "testpass123")
+    other_db = "test_jobs_other_db"
+
+    async def crash_after_copy():
+        db = get_master_db()
+        # the org lives in another database, so the rename has to copy
+        await db["organizations"].update_one({"name": "test_jobs_copy"}, {"$set": {"db": other_db}})
+        src_db = get_tenant_db(other_db)
+        await src_db[tenant_collection_name("test_jobs_copy")].insert_one({"doc": "kept"})
+        # what the first attempt got done before the worker died
+        dest_db, new_coll = get_tenant_db(), tenant_collection_name("test_jobs_copied")
+        await copy_collection(src_db, tenant_collection_name("test_jobs_copy"), dest_db, new_coll)
+
+    run(crash_after_copy)
+    result = run(OrgService.update_org_name, "test_jobs_copy", "test_jobs_copied")
+    assert result["strategy"] == "copy"
+    assert result["stats"]["resumed"] is True
+
+    async def state():
+        org = await _org("test_jobs_copied")
+        copied = await get_tenant_db()[org["collection"]].count_documents({"doc": "kept"})
+        leftover = await get_master_db()[CHECKPOINT_COLL].count_documents({"src": tenant_collection_name("test_jobs_copy")})
+        await get_tenant_db().drop_collection(org["collection"])
+        return copied, leftover
+
+    assert run(state) == (1, 0)
+
+
+def test_rename_retry_after_org_doc_update(run, monkeypatch):
+    """A rename re-run after the org doc was switched over still moves the admins"""
+    run(OrgService.create_org, "test_jobs_half", "test_jobs_half@example.com", "testpass123")
+    finish = OrgService._finish_rename
+
+    async def crash(*args):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(OrgService, "_finish_rename", crash)
+    with pytest.raises(RuntimeError):
+        run(OrgService.update_org_name, "test_jobs_half", "test_jobs_halfway")
+    monkeypatch.setattr(OrgService, "_finish_rename", finish)
+
+    result = run(OrgService.update_org_name, "test_jobs_half", "test_jobs_halfway")
+    assert (result["old_name"], result["new_name"]) == ("test_jobs_half", "test_jobs_halfway")
+
+    async def admin_org():
+        return (await get_master_db()["admins"].find_one({"email": "test_jobs_half@example.com"}))["org"]
+
+    assert run(admin_org) == "test_jobs_halfway"
+
+
+def test_job_cancelled_when_lease_cannot_be_renewed(run, monkeypatch):
+    """A run whose renewals keep failing is cancelled once the lease runs out, without committing"""
+    monkeypatch.setattr(settings, "JOB_LEASE_SECONDS", 0.3)
+    outcome = {}
+
+    async def slow(params, ctx):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            outcome["cancelled"] = True
+            raise
+        return {}
+
+    async def unreachable(job):
+        raise ConnectionError("primary unreachable")
+
+    monkeypatch.setitem(JOB_HANDLERS, "test_jobs_slow", slow)
+    monkeypatch.setattr(JobService, "renew_lease", unreachable)
+
+    async def run_job():
+        jobs = get_master_db()[JobService.JOBS_COLL]
+        # claimed by this worker; the far-off lease keeps other workers away
+        job = {
+            "type": "test_jobs_slow", "tenant": "test_jobs_lease", "locks": ["test_jobs_lease"], "params": {},
+            "status": "running", "attempts": 1, "max_attempts": 3,
+            "lease_until": datetime.now(UTC) + timedelta(hours=1),
+        }
+        await jobs.insert_one(job)
+        worker = JobWorker(1, 0.05)
+        await worker._sem.acquire()
+        await asyncio.wait_for(worker._run(job), timeout=5)
+        stored = await jobs.find_one({"_id": job["_id"]})
+        await jobs.delete_one({"_id": job["_id"]})
+        return stored["status"]
+
+    assert run(run_job) == "running"
+    assert outcome == {"cancelled": True}
@@ -0,0 +1,98 @@
+import json
+import time
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import jwt as jose_jwt
+
+from app.config import settings
+from app.utils.jwt import (
+    JoseEngine,
+    Key,
+    KeyRing,
+    NativeEngine,
+    TokenError,
+    get_token_engine,
+    reset_token_engine,
+)
+
+
+def _key(kid: str, alg: str) -> dict:
+    private = ed25519.Ed25519PrivateKey.generate() if alg == "EdDSA" else ec.generate_private_key(ec.SECP256R1())
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return {"kid": kid, "alg": alg, "private_key": pem}
+
+
+def _claims(ttl: int = 3600) -> dict:
+    return {"admin_id": "abc", "org": "Acme", "exp": int(time.time()) + ttl}
+
+
+@pytest.mark.parametrize("alg", ["EdDSA", "ES256"])
+def test_native_asymmetric_round_trip(alg):
+    ring = KeyRing([Key.from_config(_key("k1", alg))], "k1")
+    engine = NativeEngine(ring)
+    token = engine.encode(_claims())
+    assert jose_jwt.get_unverified_header(token)["kid"] == "k1"
+    assert engine.decode(token)["org"] == "Acme"
+    assert ring.jwks()["keys"][0]["kid"] == "k1"
+
+
+def test_native_es256_interoperates_with_jose():
+    ring = KeyRing([Key.from_config(_key("k1", "ES256"))], "k1")
+    assert JoseEngine(ring).decode(NativeEngine(ring).encode(_claims()))["org"] == "Acme"
+    assert NativeEngine(ring).decode(JoseEngine(ring).encode(_claims()))["org"] == "Acme"
+
+
+def test_verify_only_key_needs_no_private_key():
+    signer = KeyRing([Key.from_config(_key("k1", "EdDSA"))], "k1")
+    public_pem = signer.active.public.public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    verifier = KeyRing(
+        [Key.from_config({"kid": "k1", "alg": "EdDSA", "public_key": public_pem}), KeyRing._legacy_key()], ""
+    )
+    assert NativeEngine(verifier).decode(NativeEngine(signer).encode(_claims()))["admin_id"] == "abc"
+
+
+def test_native_rejects_expired_and_tampered_tokens():
+    engine = NativeEngine(KeyRing.legacy())
+    with pytest.raises(TokenError):
+        engine.decode(engine.encode(_claims(ttl=-1)))
+    token = engine.encode(_claims())
+    header, payload, sig = token.split(".")
+    with pytest.raises(TokenError):
+        engine.decode(f"{header}.{payload}x.{sig}")
+    with pytest.raises(TokenError):
+        engine.decode("not-a-token")
+
+
+def test_legacy_jose_tokens_still_verify():
+    token = jose_jwt.encode(_claims(), settings.SECRET_KEY, algorithm="HS256")
+    assert NativeEngine(KeyRing.legacy()).decode(token)["org"] == "Acme"
+
+
+def test_key_rotation_via_keys_file(tmp_path, monkeypatch):
+    path = tmp_path / "keys.json"
+    old, new = _key("old", "EdDSA"), _key("new", "EdDSA")
+    path.write_text(json.dumps({"active": "old", "keys": [old, new]}))
+    monkeypatch.setattr(settings, "JWT_KEYS_FILE", str(path))
+    monkeypatch.setattr("app.utils.jwt.KEY_RELOAD_INTERVAL_SECONDS", 0)
+    reset_token_engine()
+    try:
+        old_token = get_token_engine().encode(_claims())
+
+        path.write_text(json.dumps({"active": "new", "keys": [old, new]}))
+        monkeypatch.setattr("app.utils.jwt._engine_mtime", -1.0)  # mtime may not tick within the test
+        engine = get_token_engine()
+        assert engine.ring.active.kid == "new"
+        assert engine.decode(old_token)["org"] == "Acme"
+
+        path.write_text(json.dumps({"active": "new", "keys": [new]}))
+        monkeypatch.setattr("app.utils.jwt._engine_mtime", -1.0)
+        with pytest.raises(TokenError):
+            get_token_engine().decode(old_token)
+    finally:
+        reset_token_engine()
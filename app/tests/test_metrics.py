@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from app.utils.instrumentation import MONGO_LATENCY, MongoCommandMetrics
+
+
+def test_metrics_exposes_route_templates(client):
+    """Request latency is labelled by route template, not by the raw path"""
+    client.get("/jobs/000000000000000000000000", headers={"Authorization": "Bearer nope"})
+    client.get("/no/such/path")
+    body = client.get("/metrics").text
+    assert 'route="/jobs/{job_id}"' in body
+    assert "000000000000000000000000" not in body
+    assert 'route="<unmatched>"' in body
+    assert "jwt_decode_seconds_count" in body
+    assert "threadpool_threads_limit" in body
+
+
+def test_mongo_listener_labels_collection_and_op():
+    """Tenant collections share one label; getMore is attributed to its collection"""
+    listener = MongoCommandMetrics()
+
+    def roundtrip(request_id, name, command):
+        started = SimpleNamespace(command_name=name, command=command, connection_id=("h", 1), request_id=request_id)
+        listener.started(started)
+        listener.succeeded(SimpleNamespace(command_name=name, connection_id=("h", 1), request_id=request_id,
+                                           duration_micros=1500))
+
+    before = MONGO_LATENCY.count(collection="<tenant>", op="find")
+    roundtrip(1, "find", {"find": "org_acme", "filter": {}})
+    roundtrip(2, "getMore", {"getMore": 42, "collection": "admins"})
+    roundtrip(3, "ping", {"ping": 1})
+    assert MONGO_LATENCY.count(collection="<tenant>", op="find") == before + 1
+    assert MONGO_LATENCY.count(collection="admins", op="getMore") >= 1
+    assert MONGO_LATENCY.count(collection="", op="ping") >= 1
+    assert listener._pending == {}
@@ -1,28 +1,40 @@
-from fastapi.testclient import TestClient
-from app.main import app
-from app.database import get_master_db, tenant_collection_name, delete_tenant_collection
+import json
+import pytest
+from starlette.requests import Request
+from app.config import settings
+from app.database import get_master_db, delete_tenant_collection
+from app.routes.org import _read_bulk_rows
 
-client = TestClient(app)
 
-
-def teardown_module(module):
-    # clean test org collections from master_db to avoid pollution
-    try:
-        db = get_master_db()
-        # remove test entries if exist
-        db["admins"].delete_many({"email": {"$regex": "test_admin"}})
-        db["organizations"].delete_many({"name": {"$regex": "test_org"}})
-        # drop tenant collection if exists
+async def _cleanup():
+    db = get_master_db()
+    # remove test entries if exist
+    await db["admins"].delete_many({"email": {"$regex": "test_admin"}})
+    await db["organizations"].delete_many({"name": {"$regex": "test_org"}})
+    # drop tenant collection if exists
+    for name in (
+        "test_org", "test_org_Case", "test_org_bulk_existing", "test_org_bulk_1", "test_org_bulk_4",
+        "test_org_bulk_nd1", "test_org_bulk_nd2", "test_org_list_0", "test_org_list_1", "test_org_list_2", "test_org_many",
+        "test_org_bulk_fine", "test_org_bulk_mail1",
+    ):
         try:
-            delete_tenant_collection("test_org")
+            await delete_tenant_collection(name)
         except Exception:
             pass
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cleanup(run):
+    # clean test org collections from master_db to avoid pollution
+    yield
+    try:
+        run(_cleanup)
     except Exception:
         # Ignore cleanup errors
         pass
 
 
-def test_create_and_get_org():
+def test_create_and_get_org(client):
     payload = {
         "organization_name": "test_org",
         "email": "test_admin@example.com",
@@ -38,3 +50,191 @@ def test_create_and_get_org():
     assert res2.status_code == 200
     g = res2.json()
     assert g["name"] == "test_org"
+    assert g["admin_email"] == "test_admin@example.com"
+
+
+def test_get_org_is_case_insensitive(client):
+    res = client.post("/org/create", json={
+        "organization_name": "test_org_Case",
+        "email": "test_admin_case@example.com",
+        "password": "testpass123"
+    })
+    assert res.status_code == 201
+    res2 = client.get("/org/get", params={"organization_name": "TEST_ORG_CASE"})
+    assert res2.status_code == 200
+    assert res2.json()["name"] == "test_org_Case"
+    # duplicate in a different case is rejected
+    res3 = client.post("/org/create", json={
+        "organization_name": "TEST_ORG_case",
+        "email": "test_admin_case2@example.com",
+        "password": "testpass123"
+    })
+    assert res3.status_code == 400
+
+
+def test_get_org_name_is_not_a_pattern(client):
+    # regex metacharacters in the name must not match other orgs
+    res = client.get("/org/get", params={"organization_name": "test_org.*"})
+    assert res.status_code == 404
+
+
+def _ndjson(text: str) -> list[dict]:
+    return [json.loads(line) for line in text.splitlines() if line]
+
+
+def test_bulk_create_reports_per_row_results(client, operator_headers):
+    client.post("/org/create", json={
+        "organization_name": "test_org_bulk_existing",
+        "email": "test_admin_bulk_existing@example.com",
+        "password": "testpass123"
+    })
+    rows = [
+        {"organization_name": "test_org_bulk_1", "email": "test_admin_bulk_1@example.com", "password": "testpass123"},
+        {"organization_name": "TEST_ORG_BULK_1", "email": "test_admin_bulk_dup@example.com", "password": "testpass123"},
+        {"organization_name": "test_org_bulk_existing", "email": "test_admin_bulk_2@example.com", "password": "testpass123"},
+        {"organization_name": "test_org_bulk_3", "email": "not-an-email", "password": "testpass123"},
+        {"organization_name": "test_org_bulk_4", "email": "test_admin_bulk_4@example.com", "password": "testpass123"},
+    ]
+    res = client.post("/org/bulk_create", headers=operator_headers, json=rows)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = _ndjson(res.text)
+    assert [r["status"] for r in lines[:-1]] == ["created", "error", "error", "error", "created"]
+    assert lines[1]["error"] == "Duplicate organization in request"
+    assert lines[2]["error"] == "Organization already exists"
+    assert lines[-1] == {"summary": {"created": 2, "failed": 3}}
+    g = client.get("/org/get", params={"organization_name": "test_org_bulk_4"}).json()
+    assert g["admin_email"] == "test_admin_bulk_4@example.com"
+
+
+def test_bulk_create_accepts_ndjson(client, operator_headers):
+    body = "\n".join(json.dumps(r) for r in [
+        {"organization_name": "test_org_bulk_nd1", "email": "test_admin_bulk_nd1@example.com", "password": "testpass123"},
+        {"organization_name": "test_org_bulk_nd2", "email": "test_admin_bulk_nd2@example.com", "password": "testpass123"},
+    ]) + "\n{not json\n"
+    res = client.post(
+        "/org/bulk_create", content=body, headers={**operator_headers, "Content-Type": "application/x-ndjson"}
+    )
+    lines = _ndjson(res.text)
+    assert [r["status"] for r in lines[:-1]] == ["created", "created", "error"]
+    assert lines[2]["error"] == "Invalid JSON line"
+
+
+def test_bulk_create_compares_emails_as_stored(client, operator_headers):
+    """Dedupe, lookup and insert all use the validated email (domain lowercased)"""
+    res = client.post("/org/bulk_create", headers=operator_headers, json=[
+        {"organization_name": "test_org_bulk_mail1", "email": "test_admin_bulk_mail@Example.COM", "password": "testpass123"},
+        {"organization_name": "test_org_bulk_mail2", "email": "test_admin_bulk_mail@example.com", "password": "testpass123"},
+    ])
+    lines = _ndjson(res.text)
+    assert [r["status"] for r in lines[:-1]] == ["created", "error"]
+    assert lines[0]["admin_email"] == "test_admin_bulk_mail@example.com"
+    assert lines[1]["error"] == "Duplicate admin email in request"
+    login = client.post("/admin/login", json={"email": "test_admin_bulk_mail@example.com", "password": "testpass123"})
+    assert login.status_code == 200
+
+
+def test_bulk_create_collection_failure_fails_only_its_row(client, monkeypatch, operator_headers):
+    from app.services import org_service
+    real_create = org_service.create_tenant_collection
+
+    async def flaky_create(name):
+        if name == "test_org_bulk_broken":
+            raise org_service.OperationFailure("disk full", code=14031)
+        return await real_create(name)
+
+    monkeypatch.setattr(org_service, "create_tenant_collection", flaky_create)
+    res = client.post("/org/bulk_create", headers=operator_headers, json=[
+        {"organization_name": "test_org_bulk_broken", "email": "test_admin_bulk_broken@example.com", "password": "testpass123"},
+        {"organization_name": "test_org_bulk_fine", "email": "test_admin_bulk_fine@example.com", "password": "testpass123"},
+    ])
+    lines = _ndjson(res.text)
+    assert [r["status"] for r in lines[:-1]] == ["error", "created"]
+    assert lines[0]["error"] == "Tenant collection could not be created"
+    assert lines[-1] == {"summary": {"created": 1, "failed": 1}}
+    # the failed row left no org behind
+    assert client.get("/org/get", params={"organization_name": "test_org_bulk_broken"}).status_code == 404
+
+
+def test_bulk_create_requires_operator(client):
+    res = client.post("/org/bulk_create", json=[])
+    assert res.status_code == 401
+
+
+def test_bulk_create_stops_reading_past_the_row_cap(client, operator_headers, run, monkeypatch):
+    """The body is read only until the row (NDJSON) or byte cap is passed"""
+    monkeypatch.setattr(settings, "BULK_CREATE_MAX_ROWS", 2)
+    received: list[int] = []
+
+    async def receive():
+        received.append(len(received))
+        line = json.dumps({"organization_name": f"test_org_cap_{len(received)}"}).encode() + b"\n"
+        return {"type": "http.request", "body": line, "more_body": len(received) < 100}
+
+    async def read():
+        scope = {"type": "http", "method": "POST", "headers": [(b"content-type", b"application/x-ndjson")]}
+        return await _read_bulk_rows(Request(scope, receive))
+
+    assert run(read).status_code == 413
+    assert len(received) == 3
+
+    monkeypatch.setattr(settings, "BULK_CREATE_MAX_BYTES", 64)
+    res = client.post("/org/bulk_create", headers=operator_headers, json=[{"organization_name": "x" * 100}])
+    assert res.status_code == 413
+
+
+def test_bulk_create_rejects_non_array(client, operator_headers):
+    res = client.post("/org/bulk_create", headers=operator_headers, json={"organization_name": "test_org_x"})
+    assert res.status_code == 400
+
+
+def test_list_orgs_requires_operator(client):
+    assert client.get("/org/list").status_code == 401
+
+
+def test_list_orgs_paginates_with_cursor(client, operator_headers):
+    for i in range(3):
+        client.post("/org/create", json={
+            "organization_name": f"test_org_list_{i}",
+            "email": f"test_admin_list_{i}@example.com",
+            "password": "testpass123"
+        })
+    page1 = client.get("/org/list", params={"prefix": "test_org_list_", "limit": 2}, headers=operator_headers).json()
+    assert [o["name"] for o in page1["items"]] == ["test_org_list_0", "test_org_list_1"]
+    assert page1["items"][0]["admin_email"] == "test_admin_list_0@example.com"
+    page2 = client.get(
+        "/org/list",
+        params={"prefix": "test_org_list_", "limit": 2, "cursor": page1["next_cursor"]},
+        headers=operator_headers,
+    ).json()
+    assert [o["name"] for o in page2["items"]] == ["test_org_list_2"]
+    assert page2["next_cursor"] is None
+
+
+def test_list_orgs_ndjson_by_id(client, operator_headers):
+    res = client.get(
+        "/org/list", params={"prefix": "test_org_list_", "sort": "id", "format": "ndjson"}, headers=operator_headers
+    )
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = _ndjson(res.text)
+    assert len(lines) == 4
+    assert lines[-1] == {"next_cursor": None}
+    assert client.get("/org/list", params={"cursor": "garbage"}, headers=operator_headers).status_code == 400
+
+
+def test_get_many_orgs(client):
+    client.post("/org/create", json={
+        "organization_name": "test_org_many",
+        "email": "test_admin_many@example.com",
+        "password": "testpass123"
+    })
+    # warm the cache for one of them
+    assert client.get("/org/get", params={"organization_name": "test_org_list_0"}).status_code == 200
+    res = client.post("/org/get_many", json={"names": [" TEST_ORG_MANY ", "test_org_list_0", "test_org_nope"]})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["orgs"][" TEST_ORG_MANY "]["name"] == "test_org_many"
+    assert data["orgs"][" TEST_ORG_MANY "]["admin_email"] == "test_admin_many@example.com"
+    assert data["orgs"]["test_org_list_0"]["collection"] == "org_test_org_list_0"
+    assert data["missing"] == ["test_org_nope"]
+    assert client.post("/org/get_many", json={"names": []}).status_code == 422
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.config import settings
+from app.database import get_master_db
+from app.services.org_service import OrgService
+from app.utils.profiling import get_profiler
+
+
+async def _cleanup():
+    db = get_master_db()
+    await db["admins"].delete_many({"email": {"$regex": "test_profiling"}})
+    await db["organizations"].delete_many({"name": {"$regex": "test_profiling"}})
+
+
+@pytest.fixture(scope="module", autouse=True)
+def cleanup(run):
+    """Clean up test data"""
+    yield
+    try:
+        run(_cleanup)
+    except Exception:
+        # Ignore cleanup errors
+        pass
+
+
+def _login(client, run, name):
+    email = f"{name}@example.com"
+    run(OrgService.create_org, name, email, "testpass123")
+    res = client.post("/admin/login", json={"email": email, "password": "testpass123"})
+    return res.json()["access_token"]
+
+
+def test_profiling_toggle_requires_operator(client, run):
+    """Tenant admins cannot switch the process-wide profiler"""
+    token = _login(client, run, "test_profiling_tenant")
+    res = client.put("/debug/profiling", json={"enabled": True}, headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 403
+    assert not get_profiler().enabled
+
+
+def test_profiling_writes_sampled_requests(client, run, monkeypatch, tmp_path):
+    """Sampled requests are written as folded stacks plus a JSON report"""
+    token = _login(client, run, "test_profiling_operator")
+    admin_id = client.portal.call(
+        lambda: get_master_db()["admins"].find_one({"email": "test_profiling_operator@example.com"})
+    )["_id"]
+    monkeypatch.setattr(settings, "OPERATOR_ADMIN_IDS", str(admin_id))
+    monkeypatch.setattr(get_profiler(), "directory", str(tmp_path))
+    headers = {"Authorization": f"Bearer {token}"}
+
+    res = client.put("/debug/profiling", json={"enabled": True, "sample_rate": 1.0}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["enabled"] is True
+    client.get("/org/get", params={"organization_name": "test_profiling_operator"})
+    res = client.put("/debug/profiling", json={"enabled": False}, headers=headers)
+    assert res.json()["enabled"] is False
+
+    # the disabling PUT was sampled too; let the writer drain while the directory is still tmp_path
+    writer = get_profiler()._thread
+    assert writer is not None
+    writer.join(timeout=5)
+    assert not writer.is_alive()
+    assert list(tmp_path.glob("*_PUT_debug_profiling_*.json"))
+    report = json.loads(next(tmp_path.glob("*_GET_org_get_*.json")).read_text())
+    assert report["route"] == "/org/get"
+    assert report["status"] == 200
+    assert report["reason"] == "sampled"
+    assert isinstance(report["mongo_commands"], list)
+    assert list(tmp_path.glob("*_GET_org_get_*.folded"))
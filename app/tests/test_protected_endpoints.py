@@ -1,23 +1,28 @@
-from fastapi.testclient import TestClient
-from app.main import app
+import time
+import pytest
 from app.database import get_master_db
+from app.services.job_service import JobService
 from app.services.org_service import OrgService
 
-client = TestClient(app)
 
+async def _cleanup():
+    db = get_master_db()
+    await db["admins"].delete_many({"email": {"$regex": "test_protected"}})
+    await db["organizations"].delete_many({"name": {"$regex": "test_protected"}})
 
-def teardown_module(module):
+
+@pytest.fixture(scope="module", autouse=True)
+def cleanup(run):
     """Clean up test data"""
+    yield
     try:
-        db = get_master_db()
-        db["admins"].delete_many({"email": {"$regex": "test_protected"}})
-        db["organizations"].delete_many({"name": {"$regex": "test_protected"}})
+        run(_cleanup)
     except Exception:
         # Ignore cleanup errors
         pass
 
 
-def test_update_org_without_auth():
+def test_update_org_without_auth(client):
     """Test updating org without authentication"""
     response = client.put(
         "/org/update?current_name=test&new_name=test2"
@@ -25,7 +30,7 @@ def test_update_org_without_auth():
     assert response.status_code == 401
 
 
-def test_delete_org_without_auth():
+def test_delete_org_without_auth(client):
     """Test deleting org without authentication"""
     response = client.delete(
         "/org/delete?org_name=test"
@@ -33,14 +38,14 @@ def test_delete_org_without_auth():
     assert response.status_code == 401
 
 
-def test_update_org_with_auth():
+def test_update_org_with_auth(client, run, wait_for_job):
     """Test updating org with valid authentication"""
     # Create org
     org_name = "test_protected_org"
     email = "test_protected@example.com"
     password = "testpass123"
     
-    OrgService.create_org(org_name, email, password)
+    run(OrgService.create_org, org_name, email, password)
     
     # Login to get token
     login_response = client.post(
@@ -49,6 +54,9 @@ def test_update_org_with_auth():
     )
     assert login_response.status_code == 200
     token = login_response.json()["access_token"]
+
+    # warm the org metadata cache
+    assert client.get(f"/org/get?organization_name={org_name}").status_code == 200
     
     # Update org
     new_name = "test_protected_org_updated"
@@ -56,21 +64,28 @@ def test_update_org_with_auth():
         f"/org/update?current_name={org_name}&new_name={new_name}",
         headers={"Authorization": f"Bearer {token}"}
     )
-    assert response.status_code == 200
+    assert response.status_code == 202
+    job = wait_for_job(response.json()["job_id"], token)
+    assert job["status"] == "succeeded"
+    # tenants share one database by default, so the collection is renamed in place
+    assert job["result"]["strategy"] == "rename"
     
     # Verify update
     get_response = client.get(f"/org/get?organization_name={new_name}")
     assert get_response.status_code == 200
+    # the cached entry for the old name must be gone
+    old_response = client.get(f"/org/get?organization_name={org_name}")
+    assert old_response.status_code == 404
 
 
-def test_delete_org_with_auth():
+def test_delete_org_with_auth(client, run):
     """Test deleting org with valid authentication"""
     # Create org
     org_name = "test_protected_delete"
     email = "test_protected_delete@example.com"
     password = "testpass123"
     
-    OrgService.create_org(org_name, email, password)
+    run(OrgService.create_org, org_name, email, password)
     
     # Login to get token
     login_response = client.post(
@@ -79,15 +94,40 @@ def test_delete_org_with_auth():
     )
     assert login_response.status_code == 200
     token = login_response.json()["access_token"]
+
+    # warm the org metadata cache
+    assert client.get(f"/org/get?organization_name={org_name}").status_code == 200
     
     # Delete org
     response = client.delete(
         f"/org/delete?org_name={org_name}",
         headers={"Authorization": f"Bearer {token}"}
     )
-    assert response.status_code == 200
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    # the caller's admin is deleted with the org, so its token stops working
+    deadline = time.monotonic() + 30
+    while client.get(f"/jobs/{job_id}", headers={"Authorization": f"Bearer {token}"}).status_code == 200:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert run(JobService.get_job, job_id)["status"] == "succeeded"
     
     # Verify deletion
     get_response = client.get(f"/org/get?organization_name={org_name}")
     assert get_response.status_code == 404
 
+
+
+def test_job_status_requires_owner(client, run):
+    """Jobs are only visible to the admin that queued them"""
+    org_name = "test_protected_jobs"
+    email = "test_protected_jobs@example.com"
+    password = "testpass123"
+
+    run(OrgService.create_org, org_name, email, password)
+    token = client.post("/admin/login", json={"email": email, "password": password}).json()["access_token"]
+
+    response = client.get("/jobs/000000000000000000000000", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 404
+    response = client.get("/jobs/not-an-id")
+    assert response.status_code == 401
@@ -0,0 +1,72 @@
+import pytest
+
+from app.config import settings
+from app.database import get_master_db
+from app.services.tenant_copy import CHECKPOINT_COLL, clear_checkpoint, copy_collection
+
+SRC = "test_copy_src"
+DEST = "test_copy_dest"
+
+
+async def _cleanup():
+    db = get_master_db()
+    await db.drop_collection(SRC)
+    await db.drop_collection(DEST)
+    await db[CHECKPOINT_COLL].delete_many({"src": SRC})
+
+
+@pytest.fixture(autouse=True)
+def cleanup(run):
+    run(_cleanup)
+    yield
+    run(_cleanup)
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(settings, "TENANT_COPY_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "TENANT_COPY_PARTITIONS", 4)
+
+
+def test_copy_keeps_ids_and_reports_throughput(run, small_batches):
+    async def scenario():
+        db = get_master_db()
+        await db[SRC].insert_many([{"n": i} for i in range(100)])
+        stats = await copy_collection(db, SRC, db, DEST)
+        src_ids = sorted([d["_id"] async for d in db[SRC].find({}, {"_id": 1})])
+        dest_ids = sorted([d["_id"] async for d in db[DEST].find({}, {"_id": 1})])
+        # kept until the caller has switched over to the copy
+        kept = await db[CHECKPOINT_COLL].count_documents({"src": SRC})
+        await clear_checkpoint(db, SRC, db, DEST)
+        leftover = await db[CHECKPOINT_COLL].count_documents({"src": SRC})
+        return stats, src_ids, dest_ids, kept, leftover
+
+    stats, src_ids, dest_ids, kept, leftover = run(scenario)
+    assert dest_ids == src_ids
+    assert stats["docs"] == 100
+    assert stats["bytes"] > 0
+    assert stats["resumed"] is False
+    assert (kept, leftover) == (1, 0)
+
+
+def test_copy_resumes_from_checkpoint(run, small_batches):
+    async def scenario():
+        db = get_master_db()
+        await db[SRC].insert_many([{"n": i} for i in range(50)])
+        docs = [d async for d in db[SRC].find({}).sort("_id", 1)]
+        # simulate a crash after the first 20 documents were copied
+        await db[DEST].insert_many(docs[:20])
+        await db[CHECKPOINT_COLL].insert_one({
+            "_id": f"{db.name}.{SRC}->{db.name}.{DEST}",
+            "src": SRC,
+            "dest": DEST,
+            "partitions": [{"lo": None, "hi": None, "last_id": docs[19]["_id"], "done": False}],
+            "copied": 20,
+        })
+        stats = await copy_collection(db, SRC, db, DEST)
+        return stats, await db[DEST].count_documents({})
+
+    stats, dest_count = run(scenario)
+    assert stats["resumed"] is True
+    assert stats["docs"] == 30
+    assert dest_count == 50
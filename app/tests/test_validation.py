@@ -1,10 +1,4 @@
-from fastapi.testclient import TestClient
-from app.main import app
-
-client = TestClient(app)
-
-
-def test_create_org_invalid_email():
+def test_create_org_invalid_email(client):
     """Test organization creation with invalid email"""
     response = client.post(
         "/org/create",
@@ -17,7 +11,7 @@ def test_create_org_invalid_email():
     assert response.status_code == 422
 
 
-def test_create_org_short_password():
+def test_create_org_short_password(client):
     """Test organization creation with short password"""
     response = client.post(
         "/org/create",
@@ -30,7 +24,7 @@ def test_create_org_short_password():
     assert response.status_code == 422
 
 
-def test_create_org_invalid_org_name():
+def test_create_org_invalid_org_name(client):
     """Test organization creation with invalid org name"""
     response = client.post(
         "/org/create",
@@ -43,7 +37,7 @@ def test_create_org_invalid_org_name():
     assert response.status_code == 422
 
 
-def test_create_org_empty_name():
+def test_create_org_empty_name(client):
     """Test organization creation with empty name"""
     response = client.post(
         "/org/create",
@@ -56,7 +50,7 @@ def test_create_org_empty_name():
     assert response.status_code == 422
 
 
-def test_create_org_missing_fields():
+def test_create_org_missing_fields(client):
     """Test organization creation with missing fields"""
     response = client.post(
         "/org/create",
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter("cache_hits_total", "In-process cache hits, by cache")
+CACHE_MISSES = REGISTRY.counter("cache_misses_total", "In-process cache misses, by cache")
+CACHE_EVICTIONS = REGISTRY.counter(
+    "cache_evictions_total", "In-process cache entries dropped for size or expiry, by cache"
+)
+CACHE_SIZE = REGISTRY.gauge("cache_entries", "In-process cache entry count, by cache")
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a TTL.
+    Expired entries are dropped lazily on access; the least recently used entry
+    is evicted once max_size is reached.
+    """
+
+    def __init__(self, name: str, max_size: int, ttl: float):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                CACHE_MISSES.inc(cache=self.name)
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                CACHE_EVICTIONS.inc(cache=self.name)
+                CACHE_MISSES.inc(cache=self.name)
+                CACHE_SIZE.set(len(self._data), cache=self.name)
+                return default
+            self._data.move_to_end(key)
+        CACHE_HITS.inc(cache=self.name)
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                CACHE_EVICTIONS.inc(cache=self.name)
+            CACHE_SIZE.set(len(self._data), cache=self.name)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            CACHE_SIZE.set(len(self._data), cache=self.name)
+        return None if entry is _MISSING else entry[0]
+
+    def evict_where(self, predicate) -> int:
+        """
+        Drop every entry whose value matches predicate(value). A full scan, meant
+        for rare events such as revocation rather than the request path.
+        """
+        with self._lock:
+            keys = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in keys:
+                del self._data[key]
+            CACHE_SIZE.set(len(self._data), cache=self.name)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            CACHE_SIZE.set(0, cache=self.name)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": CACHE_HITS.value(cache=self.name),
+            "misses": CACHE_MISSES.value(cache=self.name),
+            "evictions": CACHE_EVICTIONS.value(cache=self.name),
+        }
+
+    def __len__(self) -> int:
+        return len(self._data)
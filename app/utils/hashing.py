@@ -1,9 +1,20 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import TypeVar
+
 import bcrypt
 
+from ..config import settings
+from .metrics import REGISTRY
+
 
-def hash_password(password: str) -> str:
+def hash_password(password: str, rounds: int | None = None) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password using bcrypt at `rounds` cost (default BCRYPT_ROUNDS).
     Bcrypt has a 72-byte limit, so we truncate if necessary.
     """
     # Convert to bytes and truncate if longer than 72 bytes
@@ -12,7 +23,7 @@ def hash_password(password: str) -> str:
         password_bytes = password_bytes[:72]
     
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds or settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
@@ -28,3 +39,123 @@ def verify_password(plain: str, hashed: str) -> bool:
     
     hashed_bytes = hashed.encode('utf-8')
     return bcrypt.checkpw(plain_bytes, hashed_bytes)
+
+
+def hash_rounds(hashed: str) -> int | None:
+    """
+    Cost factor stored in a bcrypt hash ("$2b$12$..." -> 12).
+    """
+    parts = hashed.split("$")
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+def needs_rehash(hashed: str) -> bool:
+    """
+    True when the stored cost differs from BCRYPT_ROUNDS, in either direction.
+    """
+    return hash_rounds(hashed) != settings.BCRYPT_ROUNDS
+
+
+class HashingPoolBusy(Exception):
+    """
+    Raised when the hashing executor queue is full. Mapped to 503 + Retry-After.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+HASH_QUEUE_DEPTH = REGISTRY.gauge(
+    "hash_pool_queue_depth", "bcrypt jobs submitted to the hashing pool and not finished yet"
+)
+HASH_REJECTED = REGISTRY.counter(
+    "hash_pool_rejected_total", "bcrypt jobs rejected because the hashing pool queue was full"
+)
+HASH_LATENCY = REGISTRY.histogram(
+    "hash_latency_seconds", "bcrypt latency including time spent queued, by operation"
+)
+HASH_COMPUTE = REGISTRY.histogram(
+    "hash_compute_seconds", "bcrypt time inside the worker process (no queueing), by operation"
+)
+
+T = TypeVar("T")
+
+
+def _timed(fn, *args):
+    # runs in the pool process; the caller gets the pure bcrypt time back
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class HashingExecutor:
+    """
+    Bounded process pool for bcrypt. At most `max_pending` jobs may be queued or
+    running at once; anything beyond that is rejected instead of piling up latency.
+    """
+
+    def __init__(self, workers: int, max_pending: int, retry_after: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._pending = 0
+        # spawn so worker processes never inherit the event loop or driver threads
+        self._pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    async def run(self, op: str, fn: Callable[..., T], *args) -> T:
+        if self._pending >= self.max_pending:
+            HASH_REJECTED.inc(op=op)
+            raise HashingPoolBusy(self.retry_after)
+        self._pending += 1
+        HASH_QUEUE_DEPTH.set(self._pending)
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result: T
+            result, elapsed = await loop.run_in_executor(self._pool, _timed, fn, *args)
+            HASH_COMPUTE.observe(elapsed, op=op)
+            return result
+        finally:
+            self._pending -= 1
+            HASH_QUEUE_DEPTH.set(self._pending)
+            HASH_LATENCY.observe(time.perf_counter() - start, op=op)
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_executor: HashingExecutor | None = None
+
+
+def get_hashing_executor() -> HashingExecutor:
+    global _executor
+    if _executor is None:
+        workers = settings.HASH_POOL_WORKERS or os.cpu_count() or 1
+        max_pending = settings.HASH_POOL_MAX_PENDING or workers * 8
+        _executor = HashingExecutor(workers, max_pending, settings.HASH_POOL_RETRY_AFTER_SECONDS)
+    return _executor
+
+
+def shutdown_hashing_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+    _executor = None
+
+
+async def hash_password_async(password: str) -> str:
+    # pass the cost explicitly; pool workers may have been started with other settings
+    return await get_hashing_executor().run("hash", hash_password, password, settings.BCRYPT_ROUNDS)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await get_hashing_executor().run("verify", verify_password, plain, hashed)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+from ..config import settings
+from ..database import get_client
+from ..indexes import get_index_manager
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# taken when the app package is imported, i.e. close to worker process start
+PROCESS_STARTED = time.monotonic()
+
+STARTUP_SECONDS = REGISTRY.gauge(
+    "startup_duration_seconds", "Import to end of startup hooks (the app accepts requests after this)"
+)
+READY_SECONDS = REGISTRY.gauge(
+    "ready_after_seconds", "Import to the first passing readiness check"
+)
+
+
+def record_startup() -> float:
+    elapsed = time.monotonic() - PROCESS_STARTED
+    STARTUP_SECONDS.set(elapsed)
+    if elapsed > settings.STARTUP_BUDGET_SECONDS:
+        logger.warning("startup took %.2fs (budget %.2fs)", elapsed, settings.STARTUP_BUDGET_SECONDS)
+    else:
+        logger.info("startup took %.2fs", elapsed)
+    return elapsed
+
+
+class Readiness:
+    """
+    DB reachability (ping bounded by `timeout`) plus the required indexes of the
+    registry, as reported by the background index sync (app/indexes.py). Ping
+    results are cached for `cache_seconds` and concurrent probes share one ping,
+    so a busy orchestrator cannot turn /readyz into load on Mongo.
+    """
+
+    def __init__(self, timeout: float, cache_seconds: float):
+        self.timeout = timeout
+        self.cache_seconds = cache_seconds
+        self._mongo: str | None = None
+        self._checked_at = 0.0
+        self._ever_ready = False
+        self._lock = asyncio.Lock()
+        self._warmup: asyncio.Task | None = None
+
+    def warm_up(self):
+        """
+        Start the first check in the background: the driver opens its pool while
+        startup carries on, without holding the worker back if Mongo is down.
+        """
+        if self._warmup is None:
+            self._warmup = asyncio.create_task(self.check())
+
+    async def stop(self):
+        if self._warmup is not None:
+            self._warmup.cancel()
+            await asyncio.gather(self._warmup, return_exceptions=True)
+            self._warmup = None
+
+    async def check(self) -> dict:
+        async with self._lock:
+            if self._mongo is None or time.monotonic() - self._checked_at >= self.cache_seconds:
+                self._mongo = await self._ping()
+                self._checked_at = time.monotonic()
+        indexes = get_index_manager()
+        checks = {"mongo": self._mongo, "indexes": "ok" if indexes.required_ok() else indexes.state}
+        ready = all(v == "ok" for v in checks.values())
+        if ready and not self._ever_ready:
+            self._ever_ready = True
+            READY_SECONDS.set(time.monotonic() - PROCESS_STARTED)
+            logger.info("ready: MongoDB reachable, indexes present")
+        return {"ready": ready, "checks": checks, "index_sync": indexes.report()}
+
+    async def _ping(self) -> str:
+        try:
+            with pymongo.timeout(self.timeout):
+                await get_client().admin.command("ping")
+            return "ok"
+        except PyMongoError as e:
+            return f"unreachable: {type(e).__name__}"
+
+
+_readiness: Readiness | None = None
+
+
+def get_readiness() -> Readiness:
+    global _readiness
+    if _readiness is None:
+        _readiness = Readiness(settings.READINESS_TIMEOUT_SECONDS, settings.READINESS_CACHE_SECONDS)
+    return _readiness
+
+
+async def stop_readiness():
+    global _readiness
+    if _readiness is not None:
+        await _readiness.stop()
+    _readiness = None
@@ -0,0 +1,139 @@
+import time
+from contextvars import ContextVar
+from typing import Any
+
+from anyio import to_thread
+from pymongo import monitoring
+
+from .metrics import FAST_BUCKETS, REGISTRY
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Request latency by method, route template and status",
+    buckets=FAST_BUCKETS,
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "Requests currently being handled")
+MONGO_LATENCY = REGISTRY.histogram(
+    "mongo_command_duration_seconds",
+    "Mongo command round trip by collection and command name",
+    buckets=FAST_BUCKETS,
+)
+MONGO_FAILED = REGISTRY.counter("mongo_command_failed_total", "Mongo commands that returned an error")
+THREADPOOL_BUSY = REGISTRY.gauge(
+    "threadpool_threads_busy", "Worker threads in use by sync endpoints and dependencies"
+)
+THREADPOOL_LIMIT = REGISTRY.gauge("threadpool_threads_limit", "Size of the worker thread pool")
+THREADPOOL_WAITING = REGISTRY.gauge(
+    "threadpool_tasks_waiting", "Calls queued because every worker thread is busy"
+)
+
+# request being profiled (app/utils/profiling.py); commands it issues are added to it
+CURRENT_TRACE: ContextVar = ContextVar("current_trace", default=None)
+
+# tenant collections are one per org; folded into one label value to bound cardinality
+TENANT_PREFIX = "org_"
+
+
+def collection_label(name: str) -> str:
+    return "<tenant>" if name.startswith(TENANT_PREFIX) else name
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Times every command the client sends. The driver reports the duration on the
+    succeeded / failed event; the started event is only needed for the collection,
+    which is the value of the command's first key (or "collection" for getMore).
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple, str] = {}
+        # the async driver publishes events from the awaiting task, so the
+        # contextvar still points at the request that issued the command
+        self._traces: dict[tuple, Any] = {}
+
+    def started(self, event):
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = collection_label(target) if isinstance(target, str) else ""
+        key = (event.connection_id, event.request_id)
+        self._pending[key] = collection
+        trace = CURRENT_TRACE.get()
+        if trace is not None:
+            self._traces[key] = trace
+
+    def _finish(self, event, ok: bool) -> str:
+        key = (event.connection_id, event.request_id)
+        collection = self._pending.pop(key, "")
+        MONGO_LATENCY.observe(event.duration_micros / 1e6, collection=collection, op=event.command_name)
+        trace = self._traces.pop(key, None) if self._traces else None
+        if trace is not None:
+            trace.add_command(event.command_name, collection, event.duration_micros / 1000, ok)
+        return collection
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        collection = self._finish(event, False)
+        MONGO_FAILED.inc(collection=collection, op=event.command_name)
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the matched route, prefix included. Older FastAPI copies
+    included routes with the prefix applied; newer releases keep the router's own
+    route and record the effective (prefixed) one in scope["fastapi"].
+    """
+    effective = scope.get("fastapi", {}).get("effective_route_context")
+    route = effective if effective is not None else scope.get("route")
+    path: str = getattr(route, "path", "<unmatched>")
+    return path
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task / stream overhead). The route
+    label is the matched path template, read from the scope after the router ran,
+    so /jobs/{job_id} is one series; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route_template(scope),
+                status=status_code,
+            )
+
+
+@REGISTRY.collector
+def sample_threadpool():
+    # AnyIO's default limiter backs run_in_threadpool for sync endpoints / dependencies
+    try:
+        limiter = to_thread.current_default_thread_limiter()
+    except RuntimeError:
+        return  # rendered outside an event loop
+    stats = limiter.statistics()
+    THREADPOOL_BUSY.set(stats.borrowed_tokens)
+    THREADPOOL_LIMIT.set(stats.total_tokens)
+    THREADPOOL_WAITING.set(stats.tasks_waiting)
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from ..config import settings
+from ..database import get_master_db
+
+logger = logging.getLogger(__name__)
+
+Subscriber = Callable[[str], None]
+
+# tolerated clock skew between workers publishing invalidations
+REOPEN_WINDOW_SECONDS = 30
+
+
+class InvalidationBus(ABC):
+    """
+    Fan-out of cache invalidation messages (channel, key) to every worker.
+    Subscribers are plain callables invoked with the key, e.g. TTLCache.pop.
+    """
+
+    def __init__(self):
+        self._subscribers: dict[str, list[Subscriber]] = defaultdict(list)
+
+    def subscribe(self, channel: str, callback: Subscriber):
+        self._subscribers[channel].append(callback)
+
+    def _deliver(self, channel: str, key: str):
+        for callback in self._subscribers.get(channel, ()):
+            callback(key)
+
+    @abstractmethod
+    async def publish(self, channel: str, key: str):
+        """Deliver `key` to the `channel` subscribers of every worker."""
+
+    @abstractmethod
+    async def start(self):
+        """Begin receiving other workers' messages (app startup)."""
+
+    @abstractmethod
+    async def stop(self):
+        """Stop receiving (app shutdown)."""
+
+
+class InMemoryInvalidationBus(InvalidationBus):
+    """
+    Single-process bus: delivers immediately to local subscribers.
+    Use for tests and single-worker deployments.
+    """
+
+    async def publish(self, channel: str, key: str):
+        self._deliver(channel, key)
+
+    async def start(self):
+        return None  # nothing to receive from
+
+    async def stop(self):
+        return None
+
+
+class MongoInvalidationBus(InvalidationBus):
+    """
+    Cross-worker bus on a capped collection: publishers insert a message, and every
+    worker tails the collection with a tailable-await cursor. Unlike change streams
+    this also works against a standalone mongod (no replica set needed).
+    """
+
+    def __init__(self, collection: str, size_bytes: int):
+        super().__init__()
+        self.collection = collection
+        self.size_bytes = size_bytes
+        self._task: asyncio.Task | None = None
+        self._collection_ready = False
+
+    async def _ensure_collection(self):
+        if self._collection_ready:
+            return
+        db = get_master_db()
+        try:
+            await db.create_collection(self.collection, capped=True, size=self.size_bytes)
+        except CollectionInvalid:
+            # already exists; tailable cursors need it capped
+            if not (await db[self.collection].options()).get("capped"):
+                logger.error(
+                    "%s is not a capped collection, cache invalidation cannot be tailed; drop it to let "
+                    "the app recreate it", self.collection,
+                )
+        self._collection_ready = True
+
+    async def publish(self, channel: str, key: str):
+        # local subscribers first so this worker never serves its own stale entry
+        self._deliver(channel, key)
+        # a first insert would otherwise create it as a plain collection
+        await self._ensure_collection()
+        await get_master_db()[self.collection].insert_one({"channel": channel, "key": key})
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.warning("cache invalidation tail exited with error: %s", e)
+            self._task = None
+
+    async def _tail(self):
+        # Message _ids are generated by different workers, so they are only roughly
+        # ordered: a message from a worker whose clock is behind can land after ones
+        # with a larger _id. A re-opened cursor therefore starts the skew window
+        # before the newest _id seen, and _ids seen in that window are skipped.
+        seen: dict[ObjectId, None] = {}
+        newest = ObjectId.from_datetime(datetime.now(UTC))
+        while True:
+            try:
+                await self._ensure_collection()
+                coll = get_master_db()[self.collection]
+                floor = ObjectId.from_datetime(newest.generation_time - timedelta(seconds=REOPEN_WINDOW_SECONDS))
+                cursor = coll.find({"_id": {"$gt": floor}}, cursor_type=CursorType.TAILABLE_AWAIT)
+                try:
+                    # an empty getMore ends the async for, but the cursor stays open
+                    # on the server; only re-open once it is dead
+                    while cursor.alive:
+                        async for msg in cursor:
+                            if msg["_id"] in seen:
+                                continue
+                            seen[msg["_id"]] = None
+                            newest = max(newest, msg["_id"])
+                            self._deliver(msg["channel"], msg["key"])
+                        self._forget(seen, newest)
+                finally:
+                    await cursor.close()
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logger.warning("cache invalidation tail failed, retrying: %s", e)
+            # a tailable cursor dies when nothing matches yet; back off before re-opening
+            await asyncio.sleep(1)
+
+    @staticmethod
+    def _forget(seen: dict[ObjectId, None], newest: ObjectId):
+        # _ids older than the skew window are below the next re-open floor
+        horizon = newest.generation_time - timedelta(seconds=REOPEN_WINDOW_SECONDS)
+        for _id in [i for i in seen if i.generation_time < horizon]:
+            del seen[_id]
+
+
+_bus: InvalidationBus | None = None
+
+
+def get_invalidation_bus() -> InvalidationBus:
+    global _bus
+    if _bus is None:
+        if settings.CACHE_INVALIDATION_BACKEND == "memory":
+            _bus = InMemoryInvalidationBus()
+        else:
+            _bus = MongoInvalidationBus(
+                settings.CACHE_INVALIDATION_COLLECTION, settings.CACHE_INVALIDATION_COLLECTION_BYTES
+            )
+    return _bus
@@ -1,21 +1,328 @@
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+from jose import JWTError
+from jose import jwt as jose_jwt
+
 from ..config import settings
+from .metrics import FAST_BUCKETS, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+JWT_DECODE_LATENCY = REGISTRY.histogram(
+    "jwt_decode_seconds", "Access token signature check and claim validation (token cache misses)",
+    buckets=FAST_BUCKETS,
+)
+
+# legacy tokens carry no kid and are verified with the SECRET_KEY HS256 key
+LEGACY_KID = ""
+# how often the key ring file is checked for changes (rotation without restart)
+KEY_RELOAD_INTERVAL_SECONDS = 5.0
+
+
+class TokenError(Exception):
+    """Raised for any token that must not be accepted."""
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _json(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+class Key:
+    """
+    One entry of the key ring. Key objects are parsed once at load time; signing
+    and verifying reuse them. A key without private material is verify-only.
+    """
+
+    def __init__(self, kid: str, alg: str, private=None, public=None, secret: bytes | None = None):
+        self.kid = kid
+        self.alg = alg
+        self.private = private
+        self.public = public
+        self.secret = secret
+        header = {"alg": alg, "typ": "JWT"}
+        if kid != LEGACY_KID:
+            header["kid"] = kid
+        # the header never changes for a key, so encode it once
+        self.header_segment = _b64encode(_json(header))
+
+    @property
+    def can_sign(self) -> bool:
+        return self.secret is not None or self.private is not None
+
+    def sign(self, msg: bytes) -> bytes:
+        if self.alg == "HS256" and self.secret is not None:
+            return hmac.new(self.secret, msg, hashlib.sha256).digest()
+        if self.private is None:
+            raise TokenError(f"key {self.kid} cannot sign")
+        if self.alg == "EdDSA":
+            signature: bytes = self.private.sign(msg)
+            return signature
+        if self.alg == "ES256":
+            r, s = decode_dss_signature(self.private.sign(msg, ec.ECDSA(hashes.SHA256())))
+            return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+        raise TokenError(f"unsupported alg {self.alg}")
+
+    def verify(self, msg: bytes, sig: bytes) -> bool:
+        if self.alg == "HS256":
+            return hmac.compare_digest(self.sign(msg), sig)
+        try:
+            if self.alg == "EdDSA":
+                self.public.verify(sig, msg)
+            elif self.alg == "ES256":
+                if len(sig) != 64:
+                    return False
+                der = encode_dss_signature(int.from_bytes(sig[:32], "big"), int.from_bytes(sig[32:], "big"))
+                self.public.verify(der, msg, ec.ECDSA(hashes.SHA256()))
+            else:
+                return False
+        except InvalidSignature:
+            return False
+        return True
+
+    def jwk(self) -> dict | None:
+        """Public JWK for asymmetric keys; shared-secret keys are never published."""
+        if self.alg == "EdDSA":
+            raw = self.public.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+            return {"kty": "OKP", "crv": "Ed25519", "x": _b64encode(raw), "kid": self.kid, "alg": "EdDSA", "use": "sig"}
+        if self.alg == "ES256":
+            nums = self.public.public_numbers()
+            return {
+                "kty": "EC",
+                "crv": "P-256",
+                "x": _b64encode(nums.x.to_bytes(32, "big")),
+                "y": _b64encode(nums.y.to_bytes(32, "big")),
+                "kid": self.kid,
+                "alg": "ES256",
+                "use": "sig",
+            }
+        return None
+
+    @classmethod
+    def from_config(cls, entry: dict) -> "Key":
+        kid, alg = entry["kid"], entry["alg"]
+        if alg == "HS256":
+            return cls(kid, alg, secret=entry["secret"].encode())
+        private = public = None
+        if entry.get("private_key"):
+            private = serialization.load_pem_private_key(entry["private_key"].encode(), password=None)
+            public = private.public_key()
+        elif entry.get("public_key"):
+            public = serialization.load_pem_public_key(entry["public_key"].encode())
+        expected = ed25519.Ed25519PublicKey if alg == "EdDSA" else ec.EllipticCurvePublicKey
+        if alg not in ("EdDSA", "ES256") or not isinstance(public, expected):
+            raise ValueError(f"key {kid}: unsupported alg {alg} or key type")
+        return cls(kid, alg, private=private, public=public)
+
+
+class KeyRing:
+    """
+    Keys by kid plus the kid used for signing. Rotation: add the new key, switch
+    `active` to it once every verifier has it, drop the old key after
+    ACCESS_TOKEN_EXPIRE_MINUTES.
+    """
+
+    def __init__(self, keys: list[Key], active: str):
+        self.keys = {k.kid: k for k in keys}
+        if active not in self.keys or not self.keys[active].can_sign:
+            raise ValueError(f"active key {active!r} missing or has no private key")
+        self.active = self.keys[active]
+
+    @classmethod
+    def from_file(cls, path: str, accept_legacy: bool = False) -> "KeyRing":
+        """
+        JSON file: {"active": kid, "keys": [{"kid", "alg", "secret" | "private_key" | "public_key"}]}
+        with PEM encoded keys (see scripts/jwt_keys.py). With accept_legacy, tokens
+        without a kid are still verified against SECRET_KEY while they age out.
+        """
+        with open(path) as f:
+            data = json.load(f)
+        keys = [Key.from_config(entry) for entry in data["keys"]]
+        if accept_legacy:
+            keys.append(cls._legacy_key())
+        return cls(keys, data["active"])
+
+    @staticmethod
+    def _legacy_key() -> Key:
+        return Key(LEGACY_KID, "HS256", secret=settings.SECRET_KEY.encode())
+
+    @classmethod
+    def legacy(cls) -> "KeyRing":
+        return cls([cls._legacy_key()], LEGACY_KID)
+
+    def jwks(self) -> dict:
+        return {"keys": [jwk for jwk in (k.jwk() for k in self.keys.values()) if jwk]}
+
+
+class TokenEngine(ABC):
+    name = ""
+
+    def __init__(self, ring: KeyRing):
+        self.ring = ring
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        """Sign `claims` with the ring's active key."""
+
+    @abstractmethod
+    def decode(self, token: str) -> dict:
+        """Verify `token` against the ring and return its claims."""
+
+
+class NativeEngine(TokenEngine):
+    """
+    Compact JWS built directly on `cryptography`/`hmac` with pre-parsed keys and
+    pre-encoded headers. Supports HS256, ES256 and EdDSA (Ed25519).
+    """
+
+    name = "native"
+
+    def encode(self, claims: dict) -> str:
+        key = self.ring.active
+        signing_input = f"{key.header_segment}.{_b64encode(_json(claims))}"
+        return f"{signing_input}.{_b64encode(key.sign(signing_input.encode()))}"
+
+    def decode(self, token: str) -> dict:
+        try:
+            header_seg, payload_seg, sig_seg = token.split(".")
+            header = json.loads(_b64decode(header_seg))
+            key = self.ring.keys.get(header.get("kid", LEGACY_KID))
+            if key is None or header.get("alg") != key.alg:
+                raise TokenError("unknown key or algorithm")
+            if not key.verify(f"{header_seg}.{payload_seg}".encode(), _b64decode(sig_seg)):
+                raise TokenError("bad signature")
+            claims = json.loads(_b64decode(payload_seg))
+        except TokenError:
+            raise
+        except (ValueError, TypeError, AttributeError) as e:
+            raise TokenError("malformed token") from e
+        if not isinstance(claims, dict):
+            raise TokenError("malformed token")
+        if "exp" in claims and not (isinstance(claims["exp"], (int, float)) and claims["exp"] > time.time()):
+            raise TokenError("token expired")
+        return claims
+
+
+class JoseEngine(TokenEngine):
+    """
+    python-jose; kept for comparison and compatibility. No EdDSA support.
+    """
+
+    name = "jose"
+
+    def __init__(self, ring: KeyRing):
+        super().__init__(ring)
+        for key in ring.keys.values():
+            if key.alg == "EdDSA":
+                raise ValueError("python-jose does not support EdDSA; use JWT_BACKEND=native")
+        # jose takes PEM strings; convert once instead of per call
+        self._verify_keys = {kid: self._jose_key(key, private=False) for kid, key in ring.keys.items()}
+        self._sign_key = self._jose_key(ring.active, private=True)
+
+    @staticmethod
+    def _jose_key(key: Key, private: bool):
+        if key.alg == "HS256":
+            return key.secret
+        if private:
+            return key.private.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+            ).decode()
+        return key.public.public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ).decode()
+
+    def encode(self, claims: dict) -> str:
+        key = self.ring.active
+        headers = {"kid": key.kid} if key.kid != LEGACY_KID else None
+        return jose_jwt.encode(claims, self._sign_key, algorithm=key.alg, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        try:
+            kid = jose_jwt.get_unverified_header(token).get("kid", LEGACY_KID)
+            if kid not in self.ring.keys:
+                raise TokenError("unknown key")
+            return jose_jwt.decode(token, self._verify_keys[kid], algorithms=[self.ring.keys[kid].alg])
+        except JWTError as e:
+            raise TokenError(str(e)) from e
+
+
+ENGINES = {"native": NativeEngine, "jose": JoseEngine}
+
+_engine: TokenEngine | None = None
+_engine_mtime: float | None = None
+_engine_checked = 0.0
+_engine_lock = threading.Lock()
+
+
+def _load_engine() -> tuple[TokenEngine, float | None]:
+    path = settings.JWT_KEYS_FILE
+    if path:
+        mtime = os.path.getmtime(path)
+        ring = KeyRing.from_file(path, accept_legacy=settings.JWT_ACCEPT_LEGACY_TOKENS)
+    else:
+        ring, mtime = KeyRing.legacy(), None
+    return ENGINES[settings.JWT_BACKEND](ring), mtime
+
+
+def get_token_engine() -> TokenEngine:
+    """
+    Process-wide engine. With JWT_KEYS_FILE set, the file is re-read when it
+    changes, so keys rotate without a restart.
+    """
+    global _engine, _engine_mtime, _engine_checked
+    now = time.monotonic()
+    if _engine is not None and (not settings.JWT_KEYS_FILE or now - _engine_checked < KEY_RELOAD_INTERVAL_SECONDS):
+        return _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine, _engine_mtime = _load_engine()
+        elif settings.JWT_KEYS_FILE:
+            try:
+                if os.path.getmtime(settings.JWT_KEYS_FILE) != _engine_mtime:
+                    _engine, _engine_mtime = _load_engine()
+            except (OSError, ValueError, KeyError) as e:
+                # keep serving with the current keys; a half-written file is retried later
+                logger.warning("JWT key ring reload failed: %s", e)
+        _engine_checked = now
+    return _engine
+
 
-ALGO = "HS256"
+def reset_token_engine():
+    global _engine, _engine_mtime
+    with _engine_lock:
+        _engine, _engine_mtime = None, None
 
 
-def create_access_token(data: dict, expires_hours: int | None = None) -> str:
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(hours=(expires_hours or settings.TOKEN_EXPIRE_HOURS))
-    to_encode.update({"exp": expire})
-    token = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGO)
-    return token
+def create_access_token(data: dict, expires_minutes: int | None = None) -> str:
+    ttl = (expires_minutes or settings.ACCESS_TOKEN_EXPIRE_MINUTES) * 60
+    return get_token_engine().encode({**data, "exp": int(time.time()) + ttl})
 
 
 def decode_access_token(token: str) -> dict:
+    start = time.perf_counter()
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGO])
-        return payload
-    except JWTError as e:
-        raise e
+        return get_token_engine().decode(token)
+    finally:
+        JWT_DECODE_LATENCY.observe(time.perf_counter() - start)
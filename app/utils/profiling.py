@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from datetime import UTC, datetime
+
+from ..config import settings
+from .instrumentation import CURRENT_TRACE, route_template
+from .invalidation import get_invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+# runtime switch, fanned out to every worker over the invalidation bus
+PROFILING_CHANNEL = "profiling"
+
+
+class RequestTrace:
+    """
+    Stack samples and Mongo commands of one in-flight request. Samples are added
+    by the sampler thread, commands by the driver's command listener.
+    """
+
+    def __init__(self, task: asyncio.Task, method: str, path: str, sampled: bool):
+        self.task = task
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.stacks: dict[str, int] = {}
+        self.commands: list[dict] = []
+        self.route = path
+        self.status = 500
+        self.elapsed_ms = 0.0
+
+    def add_sample(self, stack: str):
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def add_command(self, op: str, collection: str, ms: float, ok: bool):
+        self.commands.append({"op": op, "collection": collection, "ms": round(ms, 3), "ok": ok})
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def _await_chain(coro) -> list[str]:
+    """
+    Frames of a suspended task, outermost first, ending in what it waits on
+    (usually a Future completed by the driver's socket read).
+    """
+    labels = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            labels.append(f"[await {type(coro).__name__}]")
+            break
+        labels.append(_frame_label(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return labels
+
+
+def _running_stack(frame, root) -> list[str] | None:
+    """
+    The loop thread's stack from the task's outermost coroutine frame up, or None
+    if that frame is not on the stack (another task is running).
+    """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if frame is root:
+            labels.reverse()
+            return labels
+        frame = frame.f_back
+    return None
+
+
+class RequestProfiler:
+    """
+    Wall-clock sampling profiler for async requests. While switched on, a daemon
+    thread wakes every `interval` seconds and records, for each tracked request,
+    either the loop thread's stack (the request is running) or its await chain
+    (it is waiting on I/O). A request is written out if it was picked by
+    `sample_rate` or took longer than `slow_ms`.
+
+    Output per request, in `directory` (oldest files removed beyond `max_files`):
+      <time>_<method>_<route>_<ms>ms.folded  collapsed stacks for flamegraph.pl / speedscope
+      <time>_<method>_<route>_<ms>ms.json    timing, status and the Mongo commands issued
+
+    Switched off, the middleware costs one attribute check per request.
+    """
+
+    def __init__(self, directory: str, max_files: int, interval: float):
+        self.directory = directory
+        self.max_files = max_files
+        self.interval = interval
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.slow_ms = 0.0
+        self.until = 0.0
+        self._active: dict[int, RequestTrace] = {}
+        self._finished: queue.SimpleQueue = queue.SimpleQueue()
+        self._loop_thread: int | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def state(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_ms,
+            "until": self.until if self.enabled else None,
+            "directory": os.path.abspath(self.directory),
+        }
+
+    def configure(self, enabled: bool, sample_rate: float, slow_ms: float, until: float):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.until = until
+        self.enabled = enabled and until > time.time()
+        if self.enabled:
+            self._ensure_thread()
+        logger.info("request profiling %s", "enabled" if self.enabled else "disabled")
+
+    def apply(self, message: str):
+        """Bus subscriber: message is the JSON published by publish_config()."""
+        cfg = json.loads(message)
+        self.configure(cfg["enabled"], cfg["sample_rate"], cfg["slow_ms"], cfg["until"])
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+
+    def begin(self, method: str, path: str) -> RequestTrace | None:
+        if time.time() >= self.until:
+            self.enabled = False
+            return None
+        task = asyncio.current_task()
+        if task is None:
+            return None
+        self._loop_thread = threading.get_ident()
+        trace = RequestTrace(task, method, path, random.random() < self.sample_rate)
+        self._active[id(trace)] = trace
+        return trace
+
+    def end(self, trace: RequestTrace, route: str, status: int, elapsed: float):
+        trace.route, trace.status, trace.elapsed_ms = route, status, elapsed * 1000
+        # queued before it leaves _active, so the sampler thread cannot exit in between
+        if trace.sampled or trace.elapsed_ms >= self.slow_ms:
+            self._finished.put(trace)
+        self._active.pop(id(trace), None)
+
+    def _sample(self):
+        traces = list(self._active.values())
+        if not traces:
+            return
+        if self._loop_thread is None:
+            return
+        loop_frame = sys._current_frames().get(self._loop_thread)
+        for trace in traces:
+            coro = trace.task.get_coro()
+            root = getattr(coro, "cr_frame", None)
+            running = _running_stack(loop_frame, root) if root is not None else None
+            stack = running or _await_chain(coro)
+            if stack:
+                trace.add_sample(";".join(stack))
+
+    def _run(self):
+        while self.enabled or self._active or not self._finished.empty():
+            time.sleep(self.interval)
+            if self.enabled and time.time() >= self.until:
+                self.configure(False, self.sample_rate, self.slow_ms, 0.0)
+            try:
+                self._sample()
+                while not self._finished.empty():
+                    self._write(self._finished.get())
+            except Exception as e:
+                logger.warning("request profiler sample failed: %s", e)
+
+    def _write(self, trace: RequestTrace):
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.fromtimestamp(trace.started_at, UTC).strftime("%Y%m%dT%H%M%S.%f")
+        route = re.sub(r"[^A-Za-z0-9]+", "_", trace.route).strip("_") or "root"
+        base = os.path.join(self.directory, f"{stamp}_{trace.method}_{route}_{int(trace.elapsed_ms)}ms")
+        with open(base + ".folded", "w") as f:
+            for stack, count in trace.stacks.items():
+                f.write(f"{stack} {count}\n")
+        with open(base + ".json", "w") as f:
+            json.dump(
+                {
+                    "method": trace.method,
+                    "path": trace.path,
+                    "route": trace.route,
+                    "status": trace.status,
+                    "started_at": trace.started_at,
+                    "elapsed_ms": round(trace.elapsed_ms, 3),
+                    "reason": "sampled" if trace.sampled else "slow",
+                    "samples": sum(trace.stacks.values()),
+                    "interval_ms": self.interval * 1000,
+                    "mongo_commands": trace.commands,
+                },
+                f,
+                indent=2,
+            )
+        self._rotate()
+
+    def _rotate(self):
+        # names start with the UTC timestamp, so name order is age order
+        reports = sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        for name in reports[: max(0, len(reports) - self.max_files)]:
+            for ext in (".json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, name[: -len(".json")] + ext))
+                except FileNotFoundError:
+                    pass
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profiler = get_profiler()
+        if not profiler.enabled or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        trace = profiler.begin(scope["method"], scope["path"])
+        if trace is None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+            await send(message)
+
+        token = CURRENT_TRACE.set(trace)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            CURRENT_TRACE.reset(token)
+            profiler.end(trace, route_template(scope), trace.status, time.perf_counter() - start)
+
+
+async def publish_config(enabled: bool, sample_rate: float, slow_ms: float, duration_seconds: int) -> dict:
+    """
+    Switch profiling on or off on every worker. The deadline is absolute, so a
+    redelivered message never extends a profiling window.
+    """
+    until = time.time() + duration_seconds if enabled else 0.0
+    message = json.dumps({"enabled": enabled, "sample_rate": sample_rate, "slow_ms": slow_ms, "until": until})
+    await get_invalidation_bus().publish(PROFILING_CHANNEL, message)
+    return get_profiler().state()
+
+
+_profiler: RequestProfiler | None = None
+
+
+def get_profiler() -> RequestProfiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = RequestProfiler(
+            settings.PROFILING_DIR, settings.PROFILING_MAX_FILES, settings.PROFILING_INTERVAL_MS / 1000
+        )
+    return _profiler
+
+
+def _apply_config(message: str):
+    get_profiler().apply(message)
+
+
+get_invalidation_bus().subscribe(PROFILING_CHANNEL, _apply_config)
@@ -0,0 +1,172 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime, timedelta
+
+from fastapi import Request
+
+from ..config import settings
+from ..database import get_master_db
+from .metrics import REGISTRY
+
+RATE_LIMITED = REGISTRY.counter("login_rate_limited_total", "Logins rejected with 429, by bucket scope")
+
+
+class RateLimited(Exception):
+    """
+    Raised when a bucket is empty. Mapped to 429 + Retry-After.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__("Too many failed attempts")
+        self.retry_after = retry_after
+
+
+class Bucket:
+    """
+    Token bucket parameters: up to `capacity` tokens, refilled at `per_second`.
+    """
+
+    def __init__(self, scope: str, capacity: int, per_minute: float):
+        self.scope = scope
+        self.capacity = capacity
+        self.per_second = per_minute / 60
+
+    def refill(self, tokens: float, elapsed: float) -> float:
+        return min(self.capacity, tokens + elapsed * self.per_second)
+
+    def wait_for_token(self, tokens: float) -> int:
+        if tokens >= 1:
+            return 0
+        return max(1, math.ceil((1 - tokens) / self.per_second))
+
+
+class MemoryRateLimitStore:
+    """
+    Per-process buckets. The least recently touched bucket is dropped (i.e. reset
+    to full) once max_keys is reached, so a flood of distinct keys stays bounded.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tokens(self, bucket: Bucket, key: str, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (bucket.capacity, now))
+        return bucket.refill(tokens, now - updated)
+
+    async def retry_after(self, bucket: Bucket, key: str) -> int:
+        with self._lock:
+            return bucket.wait_for_token(self._tokens(bucket, key, time.monotonic()))
+
+    async def consume(self, bucket: Bucket, key: str):
+        now = time.monotonic()
+        with self._lock:
+            self._buckets[key] = (max(0.0, self._tokens(bucket, key, now) - 1), now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+
+class MongoRateLimitStore:
+    """
+    Buckets shared by all workers in a master collection. The refill and take are
+    one pipeline update, so concurrent workers never lose a decrement. Idle
+    buckets are removed by a TTL index on expires_at, declared in app/indexes.py
+    and built by the IndexManager at startup.
+    """
+
+    def __init__(self, collection: str):
+        self.collection = collection
+
+    async def retry_after(self, bucket: Bucket, key: str) -> int:
+        doc = await get_master_db()[self.collection].find_one({"_id": key})
+        if doc is None:
+            return 0
+        elapsed = (datetime.now(UTC) - doc["updated_at"].replace(tzinfo=UTC)).total_seconds()
+        return bucket.wait_for_token(bucket.refill(doc["tokens"], elapsed))
+
+    async def consume(self, bucket: Bucket, key: str):
+        now = datetime.now(UTC)
+        elapsed = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {
+            "$min": [
+                bucket.capacity,
+                {"$add": [{"$ifNull": ["$tokens", bucket.capacity]}, {"$multiply": [elapsed, bucket.per_second]}]},
+            ]
+        }
+        full_after = timedelta(seconds=bucket.capacity / bucket.per_second)
+        await get_master_db()[self.collection].update_one(
+            {"_id": key},
+            [
+                {
+                    "$set": {
+                        "tokens": {"$max": [0, {"$subtract": [refilled, 1]}]},
+                        "updated_at": now,
+                        "expires_at": now + full_after,
+                    }
+                }
+            ],
+            upsert=True,
+        )
+
+
+class LoginRateLimiter:
+    """
+    Failed logins drain a bucket per client IP and one per email. While either is
+    empty, further attempts are rejected before any DB read or bcrypt work.
+    """
+
+    def __init__(self, store, ip_bucket: Bucket, email_bucket: Bucket):
+        self.store = store
+        self.ip_bucket = ip_bucket
+        self.email_bucket = email_bucket
+
+    def _keys(self, ip: str, email: str):
+        return ((self.ip_bucket, f"ip:{ip}"), (self.email_bucket, f"email:{email.strip().lower()}"))
+
+    async def check(self, ip: str, email: str):
+        for bucket, key in self._keys(ip, email):
+            wait = await self.store.retry_after(bucket, key)
+            if wait:
+                RATE_LIMITED.inc(scope=bucket.scope)
+                raise RateLimited(wait)
+
+    async def record_failure(self, ip: str, email: str):
+        for bucket, key in self._keys(ip, email):
+            await self.store.consume(bucket, key)
+
+
+_limiter: LoginRateLimiter | None = None
+
+
+def get_login_rate_limiter() -> LoginRateLimiter | None:
+    global _limiter
+    if not settings.LOGIN_RATE_LIMIT_ENABLED:
+        return None
+    if _limiter is None:
+        store: MemoryRateLimitStore | MongoRateLimitStore
+        if settings.RATE_LIMIT_BACKEND == "mongo":
+            store = MongoRateLimitStore(settings.RATE_LIMIT_COLLECTION)
+        else:
+            store = MemoryRateLimitStore()
+        _limiter = LoginRateLimiter(
+            store,
+            Bucket("ip", settings.LOGIN_IP_BURST, settings.LOGIN_IP_REFILL_PER_MINUTE),
+            Bucket("email", settings.LOGIN_EMAIL_BURST, settings.LOGIN_EMAIL_REFILL_PER_MINUTE),
+        )
+    return _limiter
+
+
+def client_ip(request: Request) -> str:
+    """
+    Client address, taken from X-Forwarded-For only when TRUST_FORWARDED_FOR is set
+    (i.e. the app runs behind a proxy that overwrites the header).
+    """
+    if settings.TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
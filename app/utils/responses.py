@@ -0,0 +1,17 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson. The app's default response class; routes
+    that declare a response_model return it directly, so the body is serialized
+    once and not re-validated against the model (which stays for the docs).
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def ndjson_line(obj) -> bytes:
+    return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
@@ -0,0 +1,39 @@
+"""
+Standalone job worker, for running tenant jobs beside the API instead of inside it
+(set JOB_WORKER_ENABLED=false on the API processes).
+
+Usage:
+  python -m app.worker
+"""
+import asyncio
+import logging
+
+from .config import settings
+from .database import close_client, connect_client
+from .services.job_service import get_job_worker, stop_job_worker
+from .utils.invalidation import get_invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    await connect_client()
+    # jobs publish cache invalidations and read through the org cache themselves
+    bus = get_invalidation_bus()
+    await bus.start()
+    logger.info("Job worker started")
+    try:
+        await get_job_worker().start()
+        await asyncio.Event().wait()
+    finally:
+        await stop_job_worker()
+        await bus.stop()
+        await close_client()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JWT encode/decode throughput per backend and algorithm.
+
+Compares python-jose against the native engine (app/utils/jwt.py) for HS256,
+ES256 and EdDSA with freshly generated keys. No database needed.
+
+Usage:
+  python benchmarks/jwt_backends.py [--iterations 20000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.utils.jwt import ENGINES, Key, KeyRing  # noqa: E402
+
+CLAIMS = {"admin_id": "65f1c0ffee0000000000abcd", "org": "Acme Weddings", "collection": "org_acme_weddings"}
+
+
+def make_key(alg: str) -> Key:
+    if alg == "HS256":
+        return Key("bench", alg, secret=os.urandom(32))
+    private = ed25519.Ed25519PrivateKey.generate() if alg == "EdDSA" else ec.generate_private_key(ec.SECP256R1())
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    return Key.from_config({"kid": "bench", "alg": alg, "private_key": pem})
+
+
+def ops_per_sec(fn, arg, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(arg)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    claims = {**CLAIMS, "exp": int(time.time()) + 3600}
+    print(f"{'backend':8} {'alg':6} {'encode/s':>12} {'decode/s':>12}")
+    for alg in ("HS256", "ES256", "EdDSA"):
+        ring = KeyRing([make_key(alg)], "bench")
+        for name, engine_cls in ENGINES.items():
+            try:
+                engine = engine_cls(ring)
+            except ValueError:
+                print(f"{name:8} {alg:6} {'unsupported':>12}")
+                continue
+            token = engine.encode(claims)
+            assert engine.decode(token)["org"] == CLAIMS["org"]
+            enc = ops_per_sec(engine.encode, claims, args.iterations)
+            dec = ops_per_sec(engine.decode, token, args.iterations)
+            print(f"{name:8} {alg:6} {enc:12.0f} {dec:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: runs the app in-process and drives a concurrent mix of
+create / login / get / update / delete requests, then reports throughput and
+p50/p95/p99 latency per endpoint as JSON.
+
+Mongo backends:
+  --mongo mongod  start an ephemeral mongod from PATH on a free port (default when available)
+  --mongo uri     use MONGO_URI as-is, in a scratch database that is dropped afterwards
+  --mongo mock    in-memory mongomock stand-in (app overhead only, no real I/O)
+
+The request mix is driven by a fixed seed and a fixed request count, so reports
+from different commits are comparable. Pass --compare to print the change
+against an earlier report.
+
+Usage:
+  python benchmarks/load.py [--requests 5000] [--concurrency 32] [--orgs 200]
+                            [--mongo mongod|uri|mock] [--output report.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import UTC, datetime
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+# share of requests per operation; update/delete queue background jobs
+MIX = {"get": 0.55, "login": 0.2, "create": 0.1, "update": 0.1, "delete": 0.05}
+PASSWORD = "benchpass123"
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3)  # noqa: E731
+    return {
+        "count": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else None,
+        "mean_ms": ms(sum(ordered) / len(ordered)) if ordered else None,
+        "p50_ms": ms(percentile(ordered, 50)),
+        "p95_ms": ms(percentile(ordered, 95)),
+        "p99_ms": ms(percentile(ordered, 99)),
+        "max_ms": ms(ordered[-1]) if ordered else None,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mongod() -> tuple[subprocess.Popen, str, str]:
+    from pymongo import MongoClient
+
+    dbpath = tempfile.mkdtemp(prefix="bench_mongod_")
+    port = free_port()
+    proc = subprocess.Popen(
+        ["mongod", "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    uri = f"mongodb://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            MongoClient(uri, serverSelectionTimeoutMS=500).admin.command("ping")
+            return proc, uri, dbpath
+        except Exception:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise RuntimeError("mongod did not start") from None
+            time.sleep(0.2)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.statuses: dict[str, dict[str, int]] = {}
+
+    def add(self, endpoint: str, seconds: float, status: int, ok: bool):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        counts = self.statuses.setdefault(endpoint, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+class Workload:
+    """
+    Orgs created during the run are kept in a pool; update and delete each take
+    an org out of the pool so no two requests fight over the same tenant.
+    """
+
+    def __init__(self, client, recorder: Recorder, rng: random.Random, run_id: str):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.run_id = run_id
+        self.orgs: list[dict] = []
+        self._seq = 0
+
+    async def timed(self, endpoint: str, method: str, url: str, ok_status: int, **kwargs):
+        start = time.perf_counter()
+        res = await self.client.request(method, url, **kwargs)
+        self.recorder.add(endpoint, time.perf_counter() - start, res.status_code, res.status_code == ok_status)
+        return res
+
+    async def create(self, record: bool = True) -> dict | None:
+        self._seq += 1
+        name = f"bench_{self.run_id}_{self._seq}"
+        body = {"organization_name": name, "email": f"{name}@bench.example.com", "password": PASSWORD}
+        if record:
+            res = await self.timed("POST /org/create", "POST", "/org/create", 201, json=body)
+        else:
+            res = await self.client.post("/org/create", json=body)
+        if res.status_code != 201:
+            return None
+        org = {"name": name, "email": body["email"], "token": None}
+        self.orgs.append(org)
+        return org
+
+    async def login(self, org: dict | None = None) -> None:
+        org = org or self.rng.choice(self.orgs)
+        res = await self.timed(
+            "POST /admin/login", "POST", "/admin/login", 200, json={"email": org["email"], "password": PASSWORD}
+        )
+        if res.status_code == 200:
+            org["token"] = res.json()["access_token"]
+
+    async def get(self):
+        org = self.rng.choice(self.orgs)
+        await self.timed("GET /org/get", "GET", "/org/get", 200, params={"organization_name": org["name"]})
+
+    async def _take_with_token(self) -> dict | None:
+        # keep a floor of orgs for reads
+        if len(self.orgs) < 10:
+            return None
+        org = self.orgs.pop(self.rng.randrange(len(self.orgs)))
+        if org["token"] is None:
+            await self.login(org)
+        return org
+
+    async def update(self):
+        org = await self._take_with_token()
+        if org is None:
+            return await self.get()
+        await self.timed(
+            "PUT /org/update", "PUT", "/org/update", 202,
+            params={"current_name": org["name"], "new_name": org["name"] + "_r"},
+            headers={"Authorization": f"Bearer {org['token']}"},
+        )
+
+    async def delete(self):
+        org = await self._take_with_token()
+        if org is None:
+            return await self.get()
+        await self.timed(
+            "DELETE /org/delete", "DELETE", "/org/delete", 202,
+            params={"org_name": org["name"]},
+            headers={"Authorization": f"Bearer {org['token']}"},
+        )
+
+    async def run(self, requests: int, concurrency: int) -> float:
+        ops = self.rng.choices(list(MIX), weights=list(MIX.values()), k=requests)
+        queue = iter(ops)
+
+        async def worker():
+            for op in queue:
+                await getattr(self, op)()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+async def bench(args) -> dict:
+    import httpx
+
+    from app.config import settings
+    from app.database import get_client
+    from app.main import app
+
+    recorder = Recorder()
+    run_id = uuid.uuid4().hex[:6]
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            load = Workload(client, recorder, random.Random(args.seed), run_id)
+            sem = asyncio.Semaphore(args.concurrency)
+
+            async def seed_one():
+                async with sem:
+                    await load.create(record=False)
+
+            await asyncio.gather(*(seed_one() for _ in range(args.orgs)))
+            if not load.orgs:
+                raise RuntimeError("could not create any org; is Mongo reachable?")
+            # warm-up so one-off costs (pool spawn, dummy hash) stay out of the numbers
+            for org in load.orgs[:5]:
+                await load.login(org)
+            recorder.__init__()
+            elapsed = await load.run(args.requests, args.concurrency)
+        if args.mongo != "mock":
+            await get_client().drop_database(settings.MASTER_DB)
+
+    all_latencies = [v for values in recorder.latencies.values() for v in values]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "mongo": args.mongo,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed_orgs": args.orgs,
+            "seed": args.seed,
+            "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+            "mix": MIX,
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "total": summarize(all_latencies, sum(recorder.errors.values()), elapsed),
+        "endpoints": {
+            endpoint: {
+                **summarize(values, recorder.errors.get(endpoint, 0), elapsed),
+                "status": recorder.statuses[endpoint],
+            }
+            for endpoint, values in sorted(recorder.latencies.items())
+        },
+    }
+
+
+def compare(report: dict, baseline: dict):
+    print(f"\n{'endpoint':22} {'p50 ms':>16} {'p99 ms':>16} {'rps':>16}")
+    rows = [("total", report["total"], baseline.get("total", {}))]
+    rows += [(e, s, baseline.get("endpoints", {}).get(e, {})) for e, s in report["endpoints"].items()]
+    for endpoint, now, before in rows:
+        cells = []
+        for key in ("p50_ms", "p99_ms", "throughput_rps"):
+            old, new = before.get(key), now.get(key)
+            change = f"{(new - old) / old * 100:+.0f}%" if old and new is not None else "n/a"
+            cells.append(f"{new!s:>9} {change:>6}")
+        print(f"{endpoint:22} " + " ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--orgs", type=int, default=200, help="orgs created before the timed run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo", choices=["mongod", "uri", "mock"], default=None)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="kept low so bcrypt does not dominate")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="earlier report to diff against")
+    args = parser.parse_args()
+    if args.mongo is None:
+        args.mongo = "mongod" if shutil.which("mongod") else "mock"
+
+    # settings are read at import time, so configure the environment first
+    os.environ["MASTER_DB"] = f"bench_load_{uuid.uuid4().hex[:8]}"
+    os.environ["TENANT_DB"] = ""
+    os.environ["CACHE_INVALIDATION_BACKEND"] = "memory"
+    os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+    os.environ["JOB_WORKER_ENABLED"] = "true"
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    # every client may be hashing at once; measure latency rather than 503s
+    os.environ.setdefault("HASH_POOL_MAX_PENDING", str(args.concurrency * 2))
+
+    mongod = None
+    try:
+        if args.mongo == "mongod":
+            mongod, os.environ["MONGO_URI"], dbpath = start_mongod()
+        elif args.mongo == "mock":
+            from mock_mongo import install
+
+            install()
+        report = asyncio.run(bench(args))
+    finally:
+        if mongod is not None:
+            mongod.terminate()
+            mongod.wait()
+            shutil.rmtree(dbpath, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+In-memory Mongo stand-in for the load benchmark (`--mongo mock`).
+
+Routes app.database's AsyncMongoClient to mongomock-motor and papers over the
+few places where it differs from PyMongo's async API. Numbers measured on it
+reflect app overhead only (no network, no storage engine); use an ephemeral
+mongod for anything closer to production.
+"""
+
+import bson
+import mongomock_motor as mm
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import CollectionInvalid, OperationFailure
+
+NAMESPACE_EXISTS = 48
+
+
+class _RawDict(dict):
+    # tenant copies read RawBSONDocument batches and use .raw for byte counts
+    @property
+    def raw(self):
+        return bson.encode(dict(self))
+
+
+def install():
+    import app.database as database
+
+    shared = AsyncMongoMockClient()
+
+    async def close():
+        return None
+
+    shared.close = close
+    database.AsyncMongoClient = lambda *args, **kwargs: shared
+
+    orig_next = mm.AsyncCursor.next
+
+    async def next_doc(self):
+        doc = await orig_next(self)
+        return _RawDict(doc) if isinstance(doc, dict) else doc
+
+    mm.AsyncCursor.next = next_doc
+    mm.AsyncCursor.__anext__ = next_doc
+
+    orig_get_collection = mm.AsyncMongoMockDatabase.get_collection
+
+    def get_collection(self, *args, **kwargs):
+        kwargs.pop("codec_options", None)
+        return orig_get_collection(self, *args, **kwargs)
+
+    mm.AsyncMongoMockDatabase.get_collection = get_collection
+
+    orig_aggregate = mm.AsyncMongoMockCollection.aggregate
+
+    async def aggregate(self, *args, **kwargs):
+        # PyMongo's async aggregate is a coroutine returning the cursor
+        return orig_aggregate(self, *args, **kwargs)
+
+    mm.AsyncMongoMockCollection.aggregate = aggregate
+
+    orig_create = mm.AsyncMongoMockDatabase.create_collection
+
+    async def create_collection(self, name, *args, check_exists=True, **kwargs):
+        try:
+            return await orig_create(self, name, *args, **kwargs)
+        except CollectionInvalid as e:
+            if check_exists:
+                raise
+            raise OperationFailure(str(e), code=NAMESPACE_EXISTS) from e
+
+    mm.AsyncMongoMockDatabase.create_collection = create_collection
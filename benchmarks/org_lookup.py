@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: case-insensitive org lookup via anchored `$regex` vs the `name_key` index.
+
+Seeds N synthetic organizations into a scratch database, then times random lookups
+both ways and prints the query plans' docs/keys examined.
+
+Usage:
+  MONGO_URI=mongodb://localhost:27017 python benchmarks/org_lookup.py [--orgs 1000000] [--lookups 200]
+
+The scratch database (default: bench_org_lookup) is dropped at the end unless --keep is given.
+"""
+
+import argparse
+import os
+import random
+import time
+
+from pymongo import ASCENDING, MongoClient
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+SEED_BATCH = 10_000
+
+
+def seed(coll, n: int):
+    coll.drop()
+    coll.create_index([("name", ASCENDING)], unique=True)
+    coll.create_index([("name_key", ASCENDING)], unique=True)
+    batch = []
+    for i in range(n):
+        name = f"Org {i:07d} Weddings"
+        batch.append({"name": name, "name_key": name.lower(), "collection": f"org_org_{i:07d}_weddings"})
+        if len(batch) >= SEED_BATCH:
+            coll.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        coll.insert_many(batch, ordered=False)
+
+
+def timed(fn, names):
+    start = time.perf_counter()
+    for name in names:
+        assert fn(name) is not None
+    elapsed = time.perf_counter() - start
+    return elapsed / len(names) * 1000
+
+
+def examined(coll, query):
+    stats = coll.find(query).explain()["executionStats"]
+    return stats["totalDocsExamined"], stats["totalKeysExamined"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orgs", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    parser.add_argument("--db", default="bench_org_lookup")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    client = MongoClient(MONGO_URI)
+    coll = client[args.db]["organizations"]
+
+    print(f"Seeding {args.orgs} organizations into {args.db} ...")
+    t0 = time.perf_counter()
+    seed(coll, args.orgs)
+    print(f"Seeded in {time.perf_counter() - t0:.1f}s")
+
+    # look names up in a different case than stored, like a client would
+    names = [f"ORG {random.randrange(args.orgs):07d} WEDDINGS" for _ in range(args.lookups)]
+
+    def by_regex(name):
+        return coll.find_one({"name": {"$regex": f"^{name}$", "$options": "i"}})
+
+    def by_key(name):
+        return coll.find_one({"name_key": name.strip().lower()})
+
+    regex_ms = timed(by_regex, names[: max(1, args.lookups // 10)])
+    key_ms = timed(by_key, names)
+
+    sample = names[0]
+    regex_docs, regex_keys = examined(coll, {"name": {"$regex": f"^{sample}$", "$options": "i"}})
+    key_docs, key_keys = examined(coll, {"name_key": sample.lower()})
+
+    print(f"$regex   : {regex_ms:10.3f} ms/lookup  docs examined={regex_docs} keys examined={regex_keys}")
+    print(f"name_key : {key_ms:10.3f} ms/lookup  docs examined={key_docs} keys examined={key_keys}")
+    print(f"speedup  : {regex_ms / key_ms:.0f}x")
+
+    if not args.keep:
+        client.drop_database(args.db)
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
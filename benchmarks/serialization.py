@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-response serialization cost, before and after the orjson default.
+
+"before" replays the old path of a dict returned with response_model=OrgMeta
+(model validation + jsonable_encoder + stdlib json via JSONResponse); "after"
+is a direct ORJSONResponse. Also compares NDJSON line encoding as used by the
+streaming endpoints. No database needed.
+
+Usage:
+  python benchmarks/serialization.py [--iterations 100000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.schemas import OrgMeta, TokenResponse  # noqa: E402
+from app.utils.responses import ORJSONResponse, ndjson_line  # noqa: E402
+
+ORG = {"name": "Acme Weddings", "collection": "org_acme_weddings", "admin_email": "admin@acme.example.com"}
+TOKEN = {"access_token": "eyJ" + "x" * 220, "token_type": "bearer", "expires_in": 900, "refresh_token": "r" * 43}
+
+
+def us_per_call(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=100_000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    cases = [
+        (
+            "org get (response_model)",
+            lambda: JSONResponse(jsonable_encoder(OrgMeta.model_validate(ORG))).body,
+            lambda: ORJSONResponse(ORG).body,
+        ),
+        (
+            "login (JSONResponse)",
+            lambda: JSONResponse(TOKEN).body,
+            lambda: ORJSONResponse(TOKEN).body,
+        ),
+        (
+            "ndjson line",
+            lambda: (json.dumps(ORG) + "\n").encode(),
+            lambda: ndjson_line(ORG),
+        ),
+    ]
+    print(f"{'case':28} {'before us':>10} {'after us':>10} {'speedup':>8}")
+    for name, before, after in cases:
+        assert json.loads(before()) == json.loads(after())
+        b, a = us_per_call(before, n), us_per_call(after, n)
+        print(f"{name:28} {b:10.2f} {a:10.2f} {b / a:7.1f}x")
+    # keep the response model honest: the direct body still matches the schema
+    OrgMeta.model_validate_json(ORJSONResponse(ORG).body)
+    TokenResponse.model_validate_json(ORJSONResponse(TOKEN).body)
+
+
+if __name__ == "__main__":
+    main()
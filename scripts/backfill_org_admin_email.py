@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Migration — copies each org admin's email onto its organizations doc (`admin_email`),
+so /org/get can be served from a single read.
+
+Processes organizations missing `admin_email` in batches: one `$in` query on admins
+and one unordered bulk write per batch. Safe to re-run.
+
+Usage:
+  MONGO_URI=mongodb://localhost:27017 MASTER_DB=master_db python scripts/backfill_org_admin_email.py [--batch-size 1000]
+"""
+
+import argparse
+import os
+
+from bson import ObjectId
+from pymongo import MongoClient, UpdateOne
+
+MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
+MASTER_DB = os.getenv("MASTER_DB", "master_db")
+
+
+def backfill_batch(db, batch: list[dict]) -> int:
+    admin_ids = [ObjectId(o["admin_id"]) for o in batch if ObjectId.is_valid(o.get("admin_id"))]
+    emails = {
+        str(a["_id"]): a["email"]
+        for a in db["admins"].find({"_id": {"$in": admin_ids}}, {"email": 1})
+    }
+    ops = [
+        UpdateOne({"_id": o["_id"]}, {"$set": {"admin_email": emails.get(o.get("admin_id"))}})
+        for o in batch
+    ]
+    if ops:
+        db["organizations"].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"Connecting to MongoDB at {MONGO_URI}, DB: {MASTER_DB}")
+    client = MongoClient(MONGO_URI)
+    db = client[MASTER_DB]
+
+    total = 0
+    batch = []
+    cursor = db["organizations"].find({"admin_email": {"$exists": False}}, {"admin_id": 1})
+    for org in cursor:
+        batch.append(org)
+        if len(batch) >= args.batch_size:
+            total += backfill_batch(db, batch)
+            print(f"  backfilled {total} organization(s) ...")
+            batch = []
+    if batch:
+        total += backfill_batch(db, batch)
+
+    print(f"Done. Backfilled admin_email on {total} organization(s).")
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
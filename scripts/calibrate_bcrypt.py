@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Calibrate BCRYPT_ROUNDS for this host.
+
+Times bcrypt hashes at increasing cost and recommends the highest cost whose
+p99 latency stays within the budget. Run it on the hardware that serves logins;
+every extra round doubles the CPU per login.
+
+Usage:
+  python scripts/calibrate_bcrypt.py [--budget-ms 50] [--samples 20] [--min-rounds 10] [--max-rounds 16]
+"""
+
+import argparse
+import sys
+import time
+
+import bcrypt
+
+# below this the hash is too cheap to brute-force-resist; never recommend less
+SECURITY_FLOOR = 10
+
+
+def p99(samples: list[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+
+def measure(rounds: int, samples: int) -> list[float]:
+    salt = bcrypt.gensalt(rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", salt)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--min-rounds", type=int, default=SECURITY_FLOOR)
+    parser.add_argument("--max-rounds", type=int, default=16)
+    args = parser.parse_args()
+
+    chosen = None
+    print(f"{'rounds':>6} {'p50 ms':>10} {'p99 ms':>10}")
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        timings = measure(rounds, args.samples)
+        p50 = sorted(timings)[len(timings) // 2]
+        tail = p99(timings)
+        print(f"{rounds:>6} {p50:10.1f} {tail:10.1f}")
+        if tail > args.budget_ms:
+            break
+        chosen = rounds
+
+    if chosen is None:
+        print(
+            f"even {args.min_rounds} rounds exceeds {args.budget_ms} ms p99; "
+            f"use BCRYPT_ROUNDS={max(args.min_rounds, SECURITY_FLOOR)} and add hashing capacity"
+        )
+        sys.exit(1)
+    print(f"recommended: BCRYPT_ROUNDS={chosen}")
+
+
+if __name__ == "__main__":
+    main()
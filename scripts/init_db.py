@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
-Init DB script — creates essential indexes for master_db.
+Init DB script — backfills organizations.name_key and creates the master_db
+indexes declared in app/indexes.py. The API applies the same registry in the
+background at startup; run this for the backfill or with INDEX_AUTO_CREATE=false.
 
 Usage:
   MONGO_URI and MASTER_DB are read from env or defaults used.
@@ -10,28 +12,57 @@ Usage:
 
 import os
 import sys
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, UpdateOne
 from pymongo.errors import OperationFailure
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.indexes import MASTER_INDEXES  # noqa: E402
+
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MASTER_DB = os.getenv("MASTER_DB", "master_db")
+BACKFILL_BATCH_SIZE = 1000
+
+
+def org_name_key(name: str) -> str:
+    # keep in sync with app.database.org_name_key
+    return name.strip().lower()
+
+
+def backfill_name_keys(db):
+    """
+    Set `name_key` on organizations created before it existed, in batches.
+    """
+    orgs = db["organizations"]
+    total = 0
+    batch = []
+    for doc in orgs.find({"name_key": {"$exists": False}}, {"name": 1}):
+        batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"name_key": org_name_key(doc["name"])}}))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            orgs.bulk_write(batch, ordered=False)
+            total += len(batch)
+            batch = []
+    if batch:
+        orgs.bulk_write(batch, ordered=False)
+        total += len(batch)
+    return total
 
 def main():
     print(f"Connecting to MongoDB at {MONGO_URI}, DB: {MASTER_DB}")
     client = MongoClient(MONGO_URI)
     db = client[MASTER_DB]
 
-    try:
-        print("Creating unique index on organizations.name ...")
-        db["organizations"].create_index([("name", ASCENDING)], unique=True)
-    except OperationFailure as e:
-        print("Warning: could not create organizations.name index:", e)
-
-    try:
-        print("Creating unique index on admins.email ...")
-        db["admins"].create_index([("email", ASCENDING)], unique=True)
-    except OperationFailure as e:
-        print("Warning: could not create admins.email index:", e)
+    # the unique name_key index cannot build while legacy orgs lack the field
+    print("Backfilling organizations.name_key ...")
+    print(f"Backfilled {backfill_name_keys(db)} organization(s).")
+
+    for coll, specs in MASTER_INDEXES.items():
+        for spec in specs:
+            try:
+                print(f"Creating index {coll}.{spec.name} ...")
+                db[coll].create_indexes([spec.model()])
+            except OperationFailure as e:
+                print(f"Warning: could not create {coll}.{spec.name} index:", e)
 
     print("Indexes created (or already exist).")
     client.close()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Manage the JWT key ring file read by the API (JWT_KEYS_FILE).
+
+Zero-downtime rotation:
+  1. generate a new key (not active yet) and deploy the file to every worker
+  2. activate it; workers pick the change up within a few seconds
+  3. retire the old key once ACCESS_TOKEN_EXPIRE_MINUTES have passed
+
+Usage:
+  python scripts/jwt_keys.py --file keys.json generate [--alg EdDSA|ES256] [--activate]
+  python scripts/jwt_keys.py --file keys.json activate <kid>
+  python scripts/jwt_keys.py --file keys.json retire <kid>
+  python scripts/jwt_keys.py --file keys.json jwks      # public keys only, for edge verifiers
+
+The file is replaced atomically, so a worker never reads a half-written ring.
+"""
+
+import argparse
+import json
+import os
+import secrets
+import sys
+import tempfile
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def load(path: str) -> dict:
+    if not os.path.exists(path):
+        return {"active": None, "keys": []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path: str, data: dict):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".jwt_keys.")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def generate(alg: str) -> dict:
+    private = (
+        ed25519.Ed25519PrivateKey.generate()
+        if alg == "EdDSA"
+        else ec.generate_private_key(ec.SECP256R1())
+    )
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    kid = f"{time.strftime('%Y%m%d')}-{secrets.token_hex(4)}"
+    return {"kid": kid, "alg": alg, "private_key": pem}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=os.getenv("JWT_KEYS_FILE", "jwt_keys.json"))
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    gen = sub.add_parser("generate")
+    gen.add_argument("--alg", choices=["EdDSA", "ES256"], default="EdDSA")
+    gen.add_argument("--activate", action="store_true")
+    sub.add_parser("activate").add_argument("kid")
+    sub.add_parser("retire").add_argument("kid")
+    sub.add_parser("jwks")
+    args = parser.parse_args()
+
+    data = load(args.file)
+    kids = [k["kid"] for k in data["keys"]]
+
+    if args.cmd == "generate":
+        key = generate(args.alg)
+        data["keys"].append(key)
+        if args.activate or data["active"] is None:
+            data["active"] = key["kid"]
+        save(args.file, data)
+        print(f"generated {key['alg']} key {key['kid']} (active: {data['active']})")
+    elif args.cmd == "activate":
+        if args.kid not in kids:
+            sys.exit(f"unknown kid {args.kid}")
+        data["active"] = args.kid
+        save(args.file, data)
+        print(f"active key is now {args.kid}")
+    elif args.cmd == "retire":
+        if args.kid == data["active"]:
+            sys.exit("cannot retire the active key; activate another one first")
+        data["keys"] = [k for k in data["keys"] if k["kid"] != args.kid]
+        save(args.file, data)
+        print(f"retired {args.kid}")
+    elif args.cmd == "jwks":
+        from app.utils.jwt import Key
+
+        keys = [Key.from_config(entry).jwk() for entry in data["keys"]]
+        print(json.dumps({"keys": [k for k in keys if k]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Roll TENANT_INDEX_TEMPLATES out to existing tenant collections.
+
+New tenants get the template indexes at creation; run this after changing the
+templates. Collections are processed in parallel and each one is diffed first,
+so a re-run only builds what is still missing. Indexes are only ever added:
+extra or conflicting ones are reported, not dropped.
+
+Usage:
+  python scripts/reconcile_tenant_indexes.py [--concurrency 32] [--dry-run] [--org NAME ...] [--verbose]
+
+Settings (MONGO_URI, MASTER_DB, TENANT_INDEX_TEMPLATES, ...) come from the
+environment / .env, as for the API.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app.config import settings  # noqa: E402
+from app.database import close_client  # noqa: E402
+from app.indexes import reconcile_tenants, tenant_index_specs  # noqa: E402
+
+
+async def run(args) -> dict:
+    done = 0
+
+    def on_result(org: str, result: dict):
+        nonlocal done
+        done += 1
+        if args.verbose or any(s not in ("ok", "created") for s in result.values()):
+            print(json.dumps({"org": org, "indexes": result}))
+        elif done % 1000 == 0:
+            print(f"... {done} tenants", file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        totals = await reconcile_tenants(args.concurrency, not args.dry_run, args.org, on_result)
+    finally:
+        await close_client()
+    return {"tenants": done, "indexes": totals, "seconds": round(time.perf_counter() - start, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=32, help="collections processed at once")
+    parser.add_argument("--dry-run", action="store_true", help="only report what is missing")
+    parser.add_argument(
+        "--org", action="append", help="limit to these org names, case-insensitive (repeatable)"
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="print every tenant, not only problems"
+    )
+    args = parser.parse_args()
+
+    if not tenant_index_specs():
+        sys.exit("TENANT_INDEX_TEMPLATES is empty; nothing to reconcile")
+    print(f"templates: {json.dumps(settings.TENANT_INDEX_TEMPLATES)}", file=sys.stderr)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ Tests endpoints, validation, database operations, and authentication
 import requests
 import json
 import sys
+import time
 from datetime import datetime
 
 BASE_URL = "http://localhost:8000"
@@ -21,6 +22,15 @@ def log_test(name, passed, message=""):
     test_results.append((name, passed, message))
     return passed
 
+def wait_for_job(job_id, headers, timeout=30):
+    """Poll a background job until it finishes"""
+    deadline = time.time() + timeout
+    while True:
+        job = requests.get(f"{BASE_URL}/jobs/{job_id}", headers=headers).json()
+        if job.get("status") in ("succeeded", "failed") or time.time() > deadline:
+            return job
+        time.sleep(0.2)
+
 def print_section(title):
     """Print a section header"""
     print(f"\n{'='*60}")
@@ -268,11 +278,13 @@ def test_protected_endpoints():
             params={"current_name": org_name, "new_name": new_name},
             headers=headers
         )
-        passed = update_resp.status_code == 200
+        passed = update_resp.status_code == 202
         log_test("Update org with auth", passed, f"Status: {update_resp.status_code}")
         
         if passed:
-            data = update_resp.json()
+            job = wait_for_job(update_resp.json()["job_id"], headers)
+            passed = log_test("Update job succeeded", job.get("status") == "succeeded", job.get("error") or "")
+            data = job.get("result") or {}
             log_test("Update response structure", "new_name" in data)
             print(f"   Updated org: {json.dumps(data, indent=2)}")
             
@@ -292,10 +304,12 @@ def test_protected_endpoints():
             params={"org_name": org_name},
             headers=headers
         )
-        passed = delete_resp.status_code == 200
+        passed = delete_resp.status_code == 202
         log_test("Delete org with auth", passed, f"Status: {delete_resp.status_code}")
         
         if passed:
+            job = wait_for_job(delete_resp.json()["job_id"], headers)
+            log_test("Delete job succeeded", job.get("status") == "succeeded", job.get("error") or "")
             # Verify deletion
             get_resp = requests.get(f"{BASE_URL}/org/get",
                                    params={"organization_name": org_name})
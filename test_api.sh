@@ -70,6 +70,26 @@ test_endpoint() {
     fi
 }
 
+# Poll a background job until it finishes; prints the final status
+wait_for_job() {
+    local job_id=$1
+    local token=$2
+    local status=""
+    for _ in $(seq 1 60); do
+        status=$(curl -s -H "Authorization: Bearer $token" "$BASE_URL/jobs/$job_id" | \
+            python3 -c "import sys, json; print(json.load(sys.stdin).get('status', ''))" 2>/dev/null)
+        if [ "$status" = "succeeded" ] || [ "$status" = "failed" ]; then
+            break
+        fi
+        sleep 0.5
+    done
+    echo "$status"
+}
+
+job_id_from() {
+    echo "$1" | python3 -c "import sys, json; print(json.load(sys.stdin).get('job_id', ''))" 2>/dev/null
+}
+
 # Test 1: Root endpoint
 print_section "Testing Root Endpoint"
 test_endpoint "Root endpoint accessible" "GET" "$BASE_URL/" "200"
@@ -171,8 +191,14 @@ if test_endpoint "Create org for auth test" "POST" "$BASE_URL/org/create" "201"
             
             # Test update org with auth
             NEW_NAME="${AUTH_ORG}_updated"
-            if test_endpoint "Update org with auth" "PUT" "$BASE_URL/org/update?current_name=$AUTH_ORG&new_name=$NEW_NAME" "200" "" \
+            if test_endpoint "Update org with auth" "PUT" "$BASE_URL/org/update?current_name=$AUTH_ORG&new_name=$NEW_NAME" "202" "" \
                 "Authorization: Bearer $TOKEN"; then
+                JOB_STATUS=$(wait_for_job "$(job_id_from "$body")" "$TOKEN")
+                if [ "$JOB_STATUS" = "succeeded" ]; then
+                    test_pass "Update job succeeded"
+                else
+                    test_fail "Update job succeeded" "Job status: $JOB_STATUS"
+                fi
                 
                 # Verify update
                 test_endpoint "Updated org retrievable" "GET" "$BASE_URL/org/get?organization_name=$NEW_NAME" "200"
@@ -187,8 +213,15 @@ if test_endpoint "Create org for auth test" "POST" "$BASE_URL/org/create" "201"
             
             # Test delete org with auth (use updated token)
             if [ -n "$TOKEN" ]; then
-                test_endpoint "Delete org with auth" "DELETE" "$BASE_URL/org/delete?org_name=$AUTH_ORG" "200" "" \
-                    "Authorization: Bearer $TOKEN"
+                if test_endpoint "Delete org with auth" "DELETE" "$BASE_URL/org/delete?org_name=$AUTH_ORG" "202" "" \
+                    "Authorization: Bearer $TOKEN"; then
+                    JOB_STATUS=$(wait_for_job "$(job_id_from "$body")" "$TOKEN")
+                    if [ "$JOB_STATUS" = "succeeded" ]; then
+                        test_pass "Delete job succeeded"
+                    else
+                        test_fail "Delete job succeeded" "Job status: $JOB_STATUS"
+                    fi
+                fi
             fi
             
             # Verify deletion